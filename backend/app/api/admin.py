@@ -1,9 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, UploadFile, File
 from typing import List, Optional
-from app.core.security import require_role
-from app.core.database import get_collection
+from app.core.security import require_role, password_hasher
+from app.core.database import get_collection, get_analytics_collection
 from app.models.user import UserResponse
 from app.models.work_session import WorkSessionStats
+from app.core.responses import MongoJSONResponse
+from app.core.config import settings
+from app.core.storage import read_upload
+from app.core.conditional import check_history_cache
+from app.core.admission import frame_admission
+from app.services.live_feed import live_feed
+from app.services.frame_preview import frame_preview
+from app.services.onboarding import parse_rows, summarize, bulk_create_users
+from app.services.retention import retention_service
+from app.services.analytics import analytics_service, parse_date_range, sessions_query
+from app.services.reports import report_service, PERIODS
+from app.services.mailer import smtp_pool
+from app.core.profiling import profile_store
+from fastapi.responses import FileResponse
 from bson import ObjectId
 from datetime import datetime, timedelta
 
@@ -38,15 +52,30 @@ async def get_all_users(
     
     return users
 
+@router.post("/users/bulk")
+async def bulk_create_users_endpoint(
+    file: UploadFile = File(..., description="CSV with a header row, or a JSON array"),
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """Create many users (columns: email, username, full_name, password, role, optional manager_id/shift_start/shift_end)"""
+    content = await read_upload(file, settings.BULK_UPLOAD_MAX_BYTES)
+    try:
+        rows = parse_rows(content, file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return summarize(await bulk_create_users(rows, current_user))
+
 @router.get("/work-hours")
 async def get_all_work_hours(
+    request: Request,
     date: Optional[str] = None,
     user_id: Optional[str] = None,
     current_user: dict = Depends(require_role(["admin"]))
 ):
     """Get work hours for all users or specific user"""
-    sessions_collection = get_collection("work_sessions")
-    users_collection = get_collection("users")
+    sessions_collection = get_analytics_collection("work_sessions")
+    users_collection = get_analytics_collection("users")
     
     # Default to today
     if not date:
@@ -74,6 +103,10 @@ async def get_all_work_hours(
     if user_id:
         query["user_id"] = user_id
     
+    not_modified, cache_headers = await check_history_cache(request, query, end_of_day)
+    if not_modified:
+        return not_modified
+    
     # Get all sessions for the day
     cursor = sessions_collection.find(query)
     
@@ -107,18 +140,19 @@ async def get_all_work_hours(
             "sessions": sessions
         })
     
-    return result
+    return MongoJSONResponse(result, headers=cache_headers)
 
 @router.get("/calendar")
 async def get_calendar_data(
+    request: Request,
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     user_id: Optional[str] = None,
     current_user: dict = Depends(require_role(["admin"]))
 ):
     """Get work hours data for calendar view"""
-    sessions_collection = get_collection("work_sessions")
-    users_collection = get_collection("users")
+    sessions_collection = get_analytics_collection("work_sessions")
+    users_collection = get_analytics_collection("users")
     
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d")
@@ -140,6 +174,10 @@ async def get_calendar_data(
     if user_id:
         query["user_id"] = user_id
     
+    not_modified, cache_headers = await check_history_cache(request, query, end)
+    if not_modified:
+        return not_modified
+    
     cursor = sessions_collection.find(query)
     
     # Group by date and user
@@ -179,15 +217,15 @@ async def get_calendar_data(
                 "sessions": data["sessions"]
             })
     
-    return result
+    return MongoJSONResponse(result, headers=cache_headers)
 
 @router.get("/statistics")
 async def get_statistics(
     current_user: dict = Depends(require_role(["admin"]))
 ):
     """Get overall system statistics"""
-    users_collection = get_collection("users")
-    sessions_collection = get_collection("work_sessions")
+    users_collection = get_analytics_collection("users")
+    sessions_collection = get_analytics_collection("work_sessions")
     
     # Count users by role
     total_users = await users_collection.count_documents({})
@@ -215,3 +253,155 @@ async def get_statistics(
         "active_sessions_today": active_sessions,
         "completed_sessions_today": completed_sessions
     }
+
+async def _analytics_user_ids(user_id: Optional[str], manager_id: Optional[str], role: Optional[str]) -> List[str]:
+    """Resolve the users an analytics request covers"""
+    if user_id:
+        return [user_id]
+    
+    query = {"full_name": {"$exists": True}}
+    if manager_id:
+        query["manager_id"] = manager_id
+    if role:
+        query["role"] = role
+    users_collection = get_analytics_collection("users")
+    return [str(user["_id"]) async for user in users_collection.find(query, {"_id": 1})]
+
+@router.get("/analytics/timeline")
+async def get_presence_timeline(
+    request: Request,
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    user_id: Optional[str] = None,
+    manager_id: Optional[str] = None,
+    role: Optional[str] = None,
+    bucket_minutes: int = Query(15, ge=1, le=1440),
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """Per-user presence timeline (seconds present per bucket)"""
+    try:
+        start, end = parse_date_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    user_ids = await _analytics_user_ids(user_id, manager_id, role)
+    
+    not_modified, cache_headers = await check_history_cache(
+        request, sessions_query(user_ids, start, end), end - timedelta(days=1)
+    )
+    if not_modified:
+        return not_modified
+    
+    try:
+        timeline = await analytics_service.timeline(user_ids, start, end, bucket_minutes)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return MongoJSONResponse(timeline, headers=cache_headers)
+
+@router.get("/analytics/heatmap")
+async def get_utilisation_heatmap(
+    request: Request,
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    manager_id: Optional[str] = None,
+    role: Optional[str] = "employee",
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """Utilisation by weekday and hour of day for a team or role"""
+    try:
+        start, end = parse_date_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    user_ids = await _analytics_user_ids(None, manager_id, role)
+    
+    not_modified, cache_headers = await check_history_cache(
+        request, sessions_query(user_ids, start, end), end - timedelta(days=1)
+    )
+    if not_modified:
+        return not_modified
+    
+    heatmap = await analytics_service.heatmap(user_ids, start, end)
+    return MongoJSONResponse(heatmap, headers=cache_headers)
+
+@router.get("/retention/archives")
+async def list_archives(
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """List monthly work session archives"""
+    return retention_service.archives()
+
+@router.post("/retention/restore")
+async def restore_archived_sessions(
+    month: str = Query(..., description="Archive month in YYYY-MM format"),
+    user_id: Optional[str] = None,
+    session_id: Optional[List[str]] = Query(None),
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """Restore archived sessions (with their detection logs) for an audit"""
+    try:
+        restored = await retention_service.restore(month, user_id, session_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    
+    return {"month": month, "restored": restored}
+
+@router.post("/reports/run")
+async def run_reports(
+    period: str = Query("daily"),
+    date: Optional[str] = Query(None, description="Any day in the report period, YYYY-MM-DD (default: yesterday)"),
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """Build (and email) team reports now; reports that already exist are skipped"""
+    if period not in PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Period must be one of: {', '.join(PERIODS)}"
+        )
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.utcnow().date() - timedelta(days=1)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Use YYYY-MM-DD"
+        )
+    
+    try:
+        return await report_service.generate(period, day)
+    finally:
+        await smtp_pool.close()
+
+@router.get("/metrics")
+async def get_metrics(
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """Get in-process runtime metrics"""
+    return {
+        "password_hashing": password_hasher.stats(),
+        "live_feed": live_feed.stats(),
+        "preview": frame_preview.stats(),
+        "frame_admission": frame_admission.stats(),
+        "smtp": smtp_pool.stats()
+    }
+
+@router.get("/profiles")
+async def list_profiles(
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """List captured request profiles (newest first)"""
+    return profile_store.list()
+
+@router.get("/profiles/{name}")
+async def download_profile(
+    name: str,
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """Download a profile in folded-stack format (flamegraph.pl, speedscope)"""
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return FileResponse(path, media_type="text/plain", filename=name)
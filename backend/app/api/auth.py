@@ -37,7 +37,7 @@ async def register(user: UserCreate):
     
     # Create user
     user_dict = user.dict()
-    user_dict["password"] = get_password_hash(user_dict["password"])
+    user_dict["password"] = await get_password_hash(user_dict["password"])
     user_dict["is_active"] = True
     user_dict["created_at"] = datetime.utcnow()
     
@@ -56,7 +56,7 @@ async def login(login_data: LoginRequest):
     # Find user
     user = await users_collection.find_one({"email": login_data.email})
     # Defensive check: if user not found or password field missing, treat as invalid credentials
-    if not user or "password" not in user or not verify_password(login_data.password, user.get("password", "")):
+    if not user or "password" not in user or not await verify_password(login_data.password, user.get("password", "")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -1,59 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Query
 from fastapi.responses import StreamingResponse
-from app.core.security import get_current_active_user
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional
+from app.core.security import get_current_active_user, require_role, get_stream_active_user
 from app.core.database import get_collection
 from app.services.face_recognition import face_service
 from app.services.monitoring import monitoring_service
+from app.services.frame_triage import frame_triage
+from app.services.image_store import image_store
+from app.services.vision_pool import vision_pool
+from app.services.video_audit import video_auditor
+from app.services.frame_preview import frame_preview
+from app.core.config import settings
+from app.core.storage import read_upload
+from app.services.onboarding import resolve_users, summarize
+import asyncio
 import cv2
+import os
+import shutil
+import tempfile
+import zipfile
+import zlib
+from io import BytesIO
+from pymongo import UpdateOne
 import numpy as np
 import base64
-from io import BytesIO
-from PIL import Image
-from datetime import datetime
+from datetime import datetime, timezone
 from bson import ObjectId
 
 router = APIRouter()
 
+# Drop a user's cached triage state when their monitoring stops
+monitoring_service.stop_hooks.append(frame_triage.forget)
+
+def _register_face_sync(user_id: str, content: bytes) -> Optional[Dict[str, str]]:
+    """
+    Decode, encode and persist a face; runs in a worker thread
+    Returns the stored image variants
+    """
+    image = face_service.process_video_frame(content)
+    if image is None:
+        return None
+    
+    encoding = face_service.encode_face_image(image)
+    if encoding is None:
+        return None
+    
+    face_service.save_face_encoding(user_id, encoding)
+    return image_store.put(content, image)
+
 @router.post("/register-face")
 async def register_face(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Register face for user"""
-    import os
+    content = await read_upload(file, settings.FACE_UPLOAD_MAX_BYTES)
     
-    # Save uploaded file temporarily
-    file_path = f"uploads/temp/{current_user['_id']}.jpg"
+    # Decode from memory and write the artefacts off the event loop
+    face_images = await run_in_threadpool(_register_face_sync, str(current_user["_id"]), content)
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
-    
-    # Encode face
-    encoding = face_service.encode_face(file_path)
-    
-    if encoding is None:
-        os.remove(file_path)
+    if face_images is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No face detected in image"
         )
     
-    # Save encoding
-    face_service.save_face_encoding(str(current_user["_id"]), encoding)
-    
-    # Save face image
-    final_path = f"uploads/faces/{current_user['_id']}.jpg"
-    os.rename(file_path, final_path)
-    
     # Update user record
     users_collection = get_collection("users")
     await users_collection.update_one(
         {"_id": current_user["_id"]},
-        {"$set": {"face_registered": True, "face_image": final_path}}
+        {"$set": {
+            "face_registered": True,
+            "face_image": face_images["original"],
+            "face_images": face_images,
+            "updated_at": datetime.utcnow()
+        }}
     )
     
-    return {"message": "Face registered successfully", "face_image": final_path}
+    return {
+        "message": "Face registered successfully",
+        "face_image": face_images["original"],
+        "face_images": face_images
+    }
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+@router.post("/register-faces/bulk")
+async def register_faces_bulk(
+    file: UploadFile = File(..., description="Zip of images named <user_id or email>.jpg"),
+    current_user: dict = Depends(require_role(["admin", "manager"]))
+):
+    """Enroll faces for many users from a zip of images, processed in parallel"""
+    content = await read_upload(file, settings.BULK_FACE_ZIP_MAX_BYTES)
+    try:
+        archive = zipfile.ZipFile(BytesIO(content))
+    except zipfile.BadZipFile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload must be a zip archive"
+        )
+    
+    entries = [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+        and not os.path.basename(info.filename).startswith(".")
+    ]
+    if len(entries) > settings.BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BULK_MAX_ROWS} images per upload"
+        )
+    
+    keys = [os.path.splitext(os.path.basename(info.filename))[0] for info in entries]
+    users = await resolve_users(keys, current_user)
+    
+    limit = asyncio.Semaphore(settings.BULK_FACE_WORKERS)
+    
+    async def enroll(info: zipfile.ZipInfo, key: str) -> dict:
+        user = users.get(key)
+        if user is None:
+            return {"file": info.filename, "key": key, "status": "error", "detail": "User not found"}
+        # Checked before decompressing so a zip bomb cannot exhaust memory
+        if info.file_size > settings.FACE_UPLOAD_MAX_BYTES:
+            return {"file": info.filename, "key": key, "status": "error", "detail": "Image too large"}
+        async with limit:
+            try:
+                image = await run_in_threadpool(archive.read, info)
+            except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError) as e:
+                # A corrupt entry fails on its own row, not the whole upload
+                return {"file": info.filename, "key": key, "status": "error", "detail": f"Unreadable zip entry: {e}"}
+            face_images = await run_in_threadpool(_register_face_sync, str(user["_id"]), image)
+        if face_images is None:
+            return {"file": info.filename, "key": key, "status": "error", "detail": "No face detected in image"}
+        return {
+            "file": info.filename,
+            "key": key,
+            "status": "registered",
+            "id": str(user["_id"]),
+            "face_images": face_images
+        }
+    
+    results = await asyncio.gather(*(enroll(info, key) for info, key in zip(entries, keys)))
+    
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"_id": ObjectId(result["id"])},
+            {"$set": {
+                "face_registered": True,
+                "face_image": result["face_images"]["original"],
+                "face_images": result["face_images"],
+                "updated_at": now
+            }}
+        )
+        for result in results
+        if result["status"] == "registered"
+    ]
+    if operations:
+        await get_collection("users").bulk_write(operations, ordered=False)
+    
+    return summarize(list(results))
 
 @router.post("/detect")
 async def detect_face_and_eyes(
@@ -148,36 +256,198 @@ async def process_video_frame(
             detail="Invalid frame"
         )
     
-    # Detect face and eyes
-    face_detected, eyes_detected, confidence = face_service.detect_face_and_eyes(frame)
+    # Detect face and eyes (triage skips near-duplicate and unusable frames)
+    frame_quality = None
+    try:
+        if settings.FRAME_TRIAGE_ENABLED:
+            result, frame_quality = await frame_triage.detect(
+                str(current_user["_id"]), frame, vision_pool.detect_regions
+            )
+        else:
+            result = await vision_pool.detect_regions(frame)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Vision workers are busy, retry shortly"
+        )
+    # Unusable frame with no result to reuse: nothing is known about the user
+    frame_rejected = result is None
+    face_detected, eyes_detected, confidence, regions = result or (False, False, 0.0, [])
     
     # Update monitoring if session is active
     monitoring_status = None
     session_status = monitoring_service.get_session_status(str(current_user["_id"]))
     
-    if session_status:
+    if session_status and frame_rejected:
+        # Camera is still sending, so keep the session alive without touching its window
+        monitoring_service.mark_seen(str(current_user["_id"]))
+        monitoring_status = session_status
+    elif session_status:
         monitoring_status = await monitoring_service.process_detection(
             str(current_user["_id"]),
             face_detected,
             eyes_detected
         )
     
-    # Draw detection boxes for visualization
-    annotated_frame = face_service.draw_detection_boxes(frame.copy())
+    # Draw detection boxes for visualization (reuses the boxes found above)
+    annotated_frame = face_service.draw_regions(frame.copy(), regions)
     
-    # Convert frame to base64 for sending back
+    # Convert frame to base64 for sending back; watching managers get the same JPEG
     _, buffer = cv2.imencode('.jpg', annotated_frame)
+    if frame_preview.watching(str(current_user["_id"])):
+        frame_preview.publish(str(current_user["_id"]), buffer.tobytes())
     frame_base64 = base64.b64encode(buffer).decode('utf-8')
     
     return {
         "face_detected": face_detected,
         "eyes_detected": eyes_detected,
         "confidence": confidence,
+        "frame_quality": frame_quality,
         "timestamp": datetime.utcnow().isoformat(),
         "monitoring_status": monitoring_status,
         "annotated_frame": frame_base64
     }
 
+@router.get("/preview/{user_id}")
+async def stream_employee_preview(
+    user_id: str,
+    request: Request,
+    current_user: dict = Depends(require_role(["manager"], user_dependency=get_stream_active_user))
+):
+    """
+    MJPEG stream of an employee's annotated camera frames, usable directly
+    as an <img> source. Frames come from process-frame as they arrive;
+    a slow viewer skips to the newest frame.
+    """
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid user ID"
+        )
+    employee = await get_collection("users").find_one({"_id": ObjectId(user_id)}, {"manager_id": 1})
+    if not employee or employee.get("manager_id") != str(current_user["_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Employee not found"
+        )
+    
+    viewer = frame_preview.subscribe(user_id)
+    if viewer is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many viewers for this employee"
+        )
+    
+    async def frame_stream():
+        try:
+            while True:
+                frame = await viewer.next_frame(settings.LIVE_FEED_KEEPALIVE_SECONDS)
+                if frame is None:
+                    if await request.is_disconnected():
+                        break
+                    continue
+                yield (
+                    b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                    + str(len(frame)).encode() + b"\r\n\r\n" + frame + b"\r\n"
+                )
+        finally:
+            frame_preview.unsubscribe(viewer)
+    
+    return StreamingResponse(
+        frame_stream(),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/workers")
+async def get_vision_workers(
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """Get vision worker pool status and counters"""
+    return vision_pool.status()
+
+def _spool_upload(file: UploadFile, suffix: str) -> str:
+    """Copy an upload to a temporary file; runs in a worker thread"""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        shutil.copyfileobj(file.file, f, 1024 * 1024)
+    return path
+
+@router.post("/audit-video")
+async def audit_video(
+    file: UploadFile = File(..., description="Recorded webcam video"),
+    started_at: Optional[datetime] = Query(None, description="UTC time the recording started"),
+    session_id: Optional[str] = Query(None, description="Stored session to compare against"),
+    sample_fps: float = Query(settings.VIDEO_AUDIT_SAMPLE_FPS, gt=0, le=30),
+    current_user: dict = Depends(require_role(["admin", "manager"]))
+):
+    """Re-run monitoring over a recorded video and report the active time it yields"""
+    if file.size is not None and file.size > settings.VIDEO_AUDIT_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File larger than {settings.VIDEO_AUDIT_MAX_BYTES // (1024 * 1024)} MB"
+        )
+    
+    session = None
+    if session_id:
+        if not ObjectId.is_valid(session_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid session ID"
+            )
+        session = await get_collection("work_sessions").find_one(
+            {"_id": ObjectId(session_id)},
+            {"eye_detection_logs": 0}
+        )
+        if not session:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Session not found"
+            )
+        if current_user["role"] == "manager":
+            session_user = await get_collection("users").find_one({"_id": ObjectId(session["user_id"])})
+            if session_user and session_user.get("manager_id") != str(current_user["_id"]):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Not authorized to audit this session"
+                )
+        started_at = started_at or session["start_time"]
+    
+    if started_at is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="started_at or session_id is required"
+        )
+    if started_at.tzinfo is not None:
+        started_at = started_at.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    # Spooled to disk: the decoder needs a seekable file, not the whole video in memory
+    path = await run_in_threadpool(_spool_upload, file, os.path.splitext(file.filename or "")[1] or ".mp4")
+    try:
+        if os.path.getsize(path) > settings.VIDEO_AUDIT_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File larger than {settings.VIDEO_AUDIT_MAX_BYTES // (1024 * 1024)} MB"
+            )
+        try:
+            report = await video_auditor.audit(path, started_at, sample_fps)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    finally:
+        os.unlink(path)
+    
+    if session is not None:
+        report["session"] = {
+            "id": str(session["_id"]),
+            "user_id": session["user_id"],
+            "total_active_time": session.get("total_active_time", 0),
+            "difference": report["total_active_time"] - session.get("total_active_time", 0)
+        }
+    return report
+
 @router.get("/check-registration")
 async def check_face_registration(
     current_user: dict = Depends(get_current_active_user)
@@ -188,5 +458,6 @@ async def check_face_registration(
     
     return {
         "face_registered": user.get("face_registered", False),
-        "face_image": user.get("face_image")
+        "face_image": user.get("face_image"),
+        "face_images": user.get("face_images")
     }
@@ -1,9 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.core.security import get_current_active_user, require_role
-from app.core.database import get_collection
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, UploadFile, File
+from typing import List, Optional
+from app.core.security import get_current_active_user, require_role, get_stream_active_user
+from app.core.config import settings
+from app.core.database import get_collection, get_analytics_collection
 from app.models.user import UserResponse, UserCreate, ShiftUpdate
 from app.models.work_session import WorkSessionStats
+from app.core.responses import MongoJSONResponse, dumps
+from app.core.storage import read_upload
+from app.services.live_feed import live_feed
+from app.services.monitoring import monitoring_service
+from app.services.onboarding import parse_rows, summarize, bulk_create_users
+from app.services.analytics import analytics_service, parse_date_range, sessions_query
+from app.services.reports import report_service, PERIODS
+from fastapi.responses import StreamingResponse
+import asyncio
+import numpy as np
+from app.core.conditional import check_history_cache
 from bson import ObjectId
 from datetime import datetime, timedelta
 
@@ -49,7 +61,7 @@ async def create_employee(
     # Force role to be employee
     employee_dict = employee.dict()
     employee_dict["role"] = "employee"
-    employee_dict["password"] = get_password_hash(employee_dict["password"])
+    employee_dict["password"] = await get_password_hash(employee_dict["password"])
     employee_dict["is_active"] = True
     employee_dict["created_at"] = datetime.utcnow()
     employee_dict["manager_id"] = str(current_user["_id"])
@@ -61,13 +73,28 @@ async def create_employee(
     
     return UserResponse(**created_employee)
 
+@router.post("/employees/bulk")
+async def bulk_create_employees(
+    file: UploadFile = File(..., description="CSV with a header row, or a JSON array"),
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """Create many employees under this manager (columns: email, username, full_name, password, optional shift_start/shift_end)"""
+    content = await read_upload(file, settings.BULK_UPLOAD_MAX_BYTES)
+    try:
+        rows = parse_rows(content, file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return summarize(await bulk_create_users(rows, current_user))
+
 @router.get("/work-hours")
 async def get_manager_work_hours(
+    request: Request,
     date: str = None,
     current_user: dict = Depends(require_role(["manager"]))
 ):
     """Get manager's own work hours"""
-    sessions_collection = get_collection("work_sessions")
+    sessions_collection = get_analytics_collection("work_sessions")
     
     # Default to today
     if not date:
@@ -86,13 +113,19 @@ async def get_manager_work_hours(
     start_of_day = target_date.replace(hour=0, minute=0, second=0)
     end_of_day = target_date.replace(hour=23, minute=59, second=59)
     
-    cursor = sessions_collection.find({
+    query = {
         "user_id": str(current_user["_id"]),
         "start_time": {
             "$gte": start_of_day,
             "$lte": end_of_day
         }
-    })
+    }
+    
+    not_modified, cache_headers = await check_history_cache(request, query, end_of_day)
+    if not_modified:
+        return not_modified
+    
+    cursor = sessions_collection.find(query)
     
     sessions = []
     total_active_seconds = 0
@@ -102,23 +135,24 @@ async def get_manager_work_hours(
         total_active_seconds += session.get("total_active_time", 0)
         sessions.append(session)
     
-    return {
+    return MongoJSONResponse({
         "date": date,
         "user_id": str(current_user["_id"]),
         "user_name": current_user["full_name"],
         "total_active_hours": round(total_active_seconds / 3600, 2),
         "sessions": sessions
-    }
+    }, headers=cache_headers)
 
 @router.get("/employees/{employee_id}/work-hours")
 async def get_employee_work_hours(
+    request: Request,
     employee_id: str,
     date: str = None,
     current_user: dict = Depends(require_role(["manager"]))
 ):
     """Get work hours for a specific employee"""
     users_collection = get_collection("users")
-    sessions_collection = get_collection("work_sessions")
+    sessions_collection = get_analytics_collection("work_sessions")
     
     # Verify employee belongs to this manager
     employee = await users_collection.find_one({"_id": ObjectId(employee_id)})
@@ -150,13 +184,19 @@ async def get_employee_work_hours(
     start_of_day = target_date.replace(hour=0, minute=0, second=0)
     end_of_day = target_date.replace(hour=23, minute=59, second=59)
     
-    cursor = sessions_collection.find({
+    query = {
         "user_id": employee_id,
         "start_time": {
             "$gte": start_of_day,
             "$lte": end_of_day
         }
-    })
+    }
+    
+    not_modified, cache_headers = await check_history_cache(request, query, end_of_day)
+    if not_modified:
+        return not_modified
+    
+    cursor = sessions_collection.find(query)
     
     sessions = []
     total_active_seconds = 0
@@ -166,7 +206,7 @@ async def get_employee_work_hours(
         total_active_seconds += session.get("total_active_time", 0)
         sessions.append(session)
     
-    return {
+    return MongoJSONResponse({
         "date": date,
         "user_id": employee_id,
         "user_name": employee["full_name"],
@@ -174,4 +214,220 @@ async def get_employee_work_hours(
         "shift_start": employee.get("shift_start"),
         "shift_end": employee.get("shift_end"),
         "sessions": sessions
-    }
+    }, headers=cache_headers)
+
+@router.get("/live")
+async def stream_team_status(
+    request: Request,
+    current_user: dict = Depends(require_role(["manager"], user_dependency=get_stream_active_user))
+):
+    """
+    Server-sent events feed of monitoring state changes for this manager's
+    employees (session_started, session_ended, eyes_detected, eyes_lost,
+    window_completed). Served from memory, no database queries per event.
+    """
+    subscriber = live_feed.subscribe(str(current_user["_id"]))
+    
+    async def event_stream():
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        settings.LIVE_FEED_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+        finally:
+            live_feed.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/team/status")
+async def get_team_status(
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """
+    Current monitoring state and today's active time for all of this
+    manager's employees in one response. Live state comes from memory;
+    everything else takes one users query and one aggregation.
+    """
+    users_collection = get_collection("users")
+    sessions_collection = get_analytics_collection("work_sessions")
+    store = monitoring_service.sessions
+    
+    employees = await users_collection.find(
+        {"manager_id": str(current_user["_id"]), "role": "employee"},
+        {"full_name": 1, "email": 1, "shift_start": 1, "shift_end": 1, "face_images": 1}
+    ).to_list(length=None)
+    employee_ids = [str(e["_id"]) for e in employees]
+    
+    # Sessions held in memory are counted from memory, not the (possibly lagging) read path
+    live_session_ids = [
+        ObjectId(store.session_id(store.slot(uid)))
+        for uid in employee_ids
+        if uid in store
+    ]
+    
+    start_of_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    today_totals = {}
+    async for row in sessions_collection.aggregate([
+        {"$match": {
+            "user_id": {"$in": employee_ids},
+            "start_time": {"$gte": start_of_day},
+            "_id": {"$nin": live_session_ids}
+        }},
+        {"$group": {
+            "_id": "$user_id",
+            "active_seconds": {"$sum": "$total_active_time"},
+            "sessions": {"$sum": 1}
+        }}
+    ]):
+        today_totals[row["_id"]] = row
+    
+    team = []
+    for employee in employees:
+        uid = str(employee["_id"])
+        totals = today_totals.get(uid, {})
+        active_seconds = totals.get("active_seconds", 0)
+        sessions_today = totals.get("sessions", 0)
+        
+        slot = store.slot(uid)
+        live = None
+        if slot is not None:
+            active_seconds += int(store.active_seconds[slot])
+            sessions_today += 1
+            live = {
+                "session_id": store.session_id(slot),
+                "active_time": int(store.active_seconds[slot]),
+                "eyes_present": not np.isnan(store.window_start[slot]),
+                "current_window_time": float(store.window_time[slot]),
+                "last_activity": datetime.utcfromtimestamp(store.last_activity[slot]),
+                "last_seen": datetime.utcfromtimestamp(store.last_seen[slot])
+            }
+        
+        team.append({
+            "user_id": uid,
+            "full_name": employee.get("full_name"),
+            "email": employee.get("email"),
+            "shift_start": employee.get("shift_start"),
+            "shift_end": employee.get("shift_end"),
+            "face_thumbnail": (employee.get("face_images") or {}).get("thumb"),
+            "is_monitoring": live is not None,
+            "monitoring": live,
+            "sessions_today": sessions_today,
+            "today_active_seconds": active_seconds,
+            "today_active_hours": round(active_seconds / 3600, 2)
+        })
+    
+    return MongoJSONResponse({
+        "manager_id": str(current_user["_id"]),
+        "generated_at": datetime.utcnow(),
+        "employees": team
+    })
+
+async def _team_ids(manager_id: str) -> List[str]:
+    users_collection = get_analytics_collection("users")
+    cursor = users_collection.find(
+        {"manager_id": manager_id, "role": "employee"},
+        {"_id": 1}
+    )
+    return [str(user["_id"]) async for user in cursor]
+
+@router.get("/analytics/timeline")
+async def get_team_timeline(
+    request: Request,
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    employee_id: Optional[str] = None,
+    bucket_minutes: int = Query(15, ge=1, le=1440),
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """Per-employee presence timeline (seconds present per bucket)"""
+    try:
+        start, end = parse_date_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    user_ids = await _team_ids(str(current_user["_id"]))
+    if employee_id:
+        if employee_id not in user_ids:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not your employee"
+            )
+        user_ids = [employee_id]
+    
+    not_modified, cache_headers = await check_history_cache(
+        request, sessions_query(user_ids, start, end), end - timedelta(days=1)
+    )
+    if not_modified:
+        return not_modified
+    
+    try:
+        timeline = await analytics_service.timeline(user_ids, start, end, bucket_minutes)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return MongoJSONResponse(timeline, headers=cache_headers)
+
+@router.get("/analytics/heatmap")
+async def get_team_heatmap(
+    request: Request,
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """Team utilisation by weekday and hour of day"""
+    try:
+        start, end = parse_date_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    user_ids = await _team_ids(str(current_user["_id"]))
+    
+    not_modified, cache_headers = await check_history_cache(
+        request, sessions_query(user_ids, start, end), end - timedelta(days=1)
+    )
+    if not_modified:
+        return not_modified
+    
+    heatmap = await analytics_service.heatmap(user_ids, start, end)
+    return MongoJSONResponse(heatmap, headers=cache_headers)
+
+@router.get("/reports/{period}")
+async def get_team_report(
+    period: str,
+    date: Optional[str] = Query(None, description="Any day in the report period, YYYY-MM-DD (default: latest)"),
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """Precomputed daily or weekly work-hours report for this manager's team"""
+    if period not in PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Period must be one of: {', '.join(PERIODS)}"
+        )
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date() if date else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Use YYYY-MM-DD"
+        )
+    
+    report = await report_service.cached(str(current_user["_id"]), period, day)
+    if not report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not generated yet"
+        )
+    return MongoJSONResponse(report)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from typing import List
 from app.core.security import get_current_active_user, require_role, get_password_hash
 from app.core.database import get_collection
+from app.core.config import settings
+from app.core.storage import read_upload
 from app.models.user import UserResponse, UserUpdate, ShiftUpdate
+from app.services.shift_scheduler import shift_scheduler
+from app.services.onboarding import parse_rows, summarize, bulk_update_shifts
 from bson import ObjectId
 from datetime import datetime
 
@@ -32,6 +36,20 @@ async def get_users(
     
     return users
 
+@router.put("/shifts/bulk")
+async def bulk_update_shifts_endpoint(
+    file: UploadFile = File(..., description="CSV with a header row, or a JSON array"),
+    current_user: dict = Depends(require_role(["admin", "manager"]))
+):
+    """Assign shifts to many users (columns: user_id or email, shift_start, shift_end)"""
+    content = await read_upload(file, settings.BULK_UPLOAD_MAX_BYTES)
+    try:
+        rows = parse_rows(content, file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return summarize(await bulk_update_shifts(rows, current_user))
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
@@ -91,15 +109,18 @@ async def update_user(
     
     update_data = user_update.dict(exclude_unset=True)
     if "password" in update_data:
-        update_data["password"] = get_password_hash(update_data["password"])
+        update_data["password"] = await get_password_hash(update_data["password"])
     
     if update_data:
+        update_data["updated_at"] = datetime.utcnow()
         await users_collection.update_one(
             {"_id": ObjectId(user_id)},
             {"$set": update_data}
         )
     
     updated_user = await users_collection.find_one({"_id": ObjectId(user_id)})
+    if "is_active" in update_data or "full_name" in update_data:
+        shift_scheduler.update_user(updated_user)
     updated_user["id"] = str(updated_user["_id"])
     return UserResponse(**updated_user)
 
@@ -118,6 +139,8 @@ async def delete_user(
             detail="User not found"
         )
     
+    shift_scheduler.remove_user(user_id)
+    
     return {"message": "User deleted successfully"}
 
 @router.put("/{user_id}/shift", response_model=UserResponse)
@@ -151,10 +174,12 @@ async def update_shift(
         {"_id": ObjectId(user_id)},
         {"$set": {
             "shift_start": shift.shift_start,
-            "shift_end": shift.shift_end
+            "shift_end": shift.shift_end,
+            "updated_at": datetime.utcnow()
         }}
     )
     
     updated_user = await users_collection.find_one({"_id": ObjectId(user_id)})
+    shift_scheduler.update_user(updated_user)
     updated_user["id"] = str(updated_user["_id"])
     return UserResponse(**updated_user)
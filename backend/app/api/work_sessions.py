@@ -8,7 +8,8 @@ from app.models.work_session import (
     SessionStatus,
     MonitoringStatus
 )
-from app.services.monitoring import monitoring_service
+from app.core.responses import MongoJSONResponse, trusted_payload
+from app.services.monitoring import monitoring_service, new_session_document
 from bson import ObjectId
 from datetime import datetime, timedelta
 
@@ -34,30 +35,23 @@ async def start_work_session(
         )
     
     # Create new session
-    session_data = {
-        "user_id": str(current_user["_id"]),
-        "user_name": current_user["full_name"],
-        "start_time": datetime.utcnow(),
-        "end_time": None,
-        "status": "active",
-        "total_active_time": 0,
-        "eye_detection_logs": [],
-        "shift_start": current_user.get("shift_start"),
-        "shift_end": current_user.get("shift_end"),
-        "created_at": datetime.utcnow()
-    }
+    session_data = new_session_document(current_user, monitoring_service.owner)
     
     result = await sessions_collection.insert_one(session_data)
     session_id = str(result.inserted_id)
     
     # Start monitoring
-    await monitoring_service.start_monitoring(str(current_user["_id"]), session_id)
+    await monitoring_service.start_monitoring(
+        str(current_user["_id"]),
+        session_id,
+        manager_id=current_user.get("manager_id")
+    )
     
     # Get created session
     created_session = await sessions_collection.find_one({"_id": result.inserted_id})
     created_session["id"] = str(created_session["_id"])
     
-    return WorkSessionResponse(**created_session)
+    return MongoJSONResponse(trusted_payload(WorkSessionResponse, created_session))
 
 @router.post("/end/{session_id}")
 async def end_work_session(
@@ -95,7 +89,8 @@ async def end_work_session(
         {
             "$set": {
                 "end_time": datetime.utcnow(),
-                "status": "completed"
+                "status": "completed",
+                "updated_at": datetime.utcnow()
             }
         }
     )
@@ -118,7 +113,7 @@ async def get_active_session(
         return None
     
     session["id"] = str(session["_id"])
-    return WorkSessionResponse(**session)
+    return MongoJSONResponse(trusted_payload(WorkSessionResponse, session))
 
 @router.get("/status", response_model=Optional[MonitoringStatus])
 async def get_monitoring_status(
@@ -152,7 +147,7 @@ async def get_session_history(
         session["id"] = str(session["_id"])
         sessions.append(session)
     
-    return sessions
+    return MongoJSONResponse(sessions)
 
 @router.get("/{session_id}", response_model=WorkSessionResponse)
 async def get_session(
@@ -187,4 +182,4 @@ async def get_session(
             )
     
     session["id"] = str(session["_id"])
-    return WorkSessionResponse(**session)
+    return MongoJSONResponse(trusted_payload(WorkSessionResponse, session))
@@ -0,0 +1,143 @@
+from typing import Callable, Dict, Optional, Tuple
+import json
+import math
+import time
+from jose import JWTError, jwt
+from app.core.config import settings
+
+class FrameAdmission:
+    """
+    Token buckets for frame ingestion: one per user plus one shared by
+    everyone. When the shared bucket runs low, its last tokens are kept
+    for users without an open eye detection window, whose next frames
+    decide whether one starts; users mid-window only extend theirs.
+    """
+
+    def __init__(
+        self,
+        user_rate: float = settings.FRAME_RATE_PER_USER,
+        user_burst: float = settings.FRAME_BURST_PER_USER,
+        global_rate: float = settings.FRAME_RATE_GLOBAL,
+        global_burst: float = settings.FRAME_BURST_GLOBAL,
+        reserve: float = settings.FRAME_GLOBAL_RESERVE,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.reserve = reserve * global_burst
+        self.clock = clock
+        # user_id -> (tokens, refilled at)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._global_tokens = global_burst
+        self._global_at = clock()
+        self._pruned_at = self._global_at
+        self.counters = {"admitted": 0, "rejected_user": 0, "rejected_global": 0, "rejected_in_window": 0}
+
+    def _prune(self, now: float):
+        # A bucket idle long enough to be full behaves like a missing one
+        full_after = self.user_burst / self.user_rate
+        self._buckets = {
+            user_id: bucket for user_id, bucket in self._buckets.items()
+            if now - bucket[1] < full_after
+        }
+        self._pruned_at = now
+
+    def admit(self, user_id: str, in_window: bool = False) -> Optional[float]:
+        """
+        Take a token for one frame from user_id
+        Returns None if admitted, else the seconds to wait before retrying
+        """
+        now = self.clock()
+        if now - self._pruned_at > 60:
+            self._prune(now)
+
+        tokens, at = self._buckets.get(user_id, (self.user_burst, now))
+        tokens = min(self.user_burst, tokens + (now - at) * self.user_rate)
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
+            self.counters["rejected_user"] += 1
+            return (1 - tokens) / self.user_rate
+
+        if self.global_rate > 0:
+            self._global_tokens = min(
+                self.global_burst,
+                self._global_tokens + (now - self._global_at) * self.global_rate
+            )
+            self._global_at = now
+            floor = self.reserve + 1 if in_window else 1
+            if self._global_tokens < floor:
+                self._buckets[user_id] = (tokens, now)
+                self.counters["rejected_in_window" if in_window else "rejected_global"] += 1
+                return (floor - self._global_tokens) / self.global_rate
+            self._global_tokens -= 1
+
+        self._buckets[user_id] = (tokens - 1, now)
+        self.counters["admitted"] += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "tracked_users": len(self._buckets),
+            "global_tokens": round(self._global_tokens, 1) if self.global_rate > 0 else None
+        }
+
+# Global instance
+frame_admission = FrameAdmission()
+
+class AdmissionMiddleware:
+    """
+    Applies frame_admission to frame uploads before the multipart body is
+    read or the image decoded. The user comes from the bearer token's
+    subject without a database lookup; requests without a valid token
+    pass through and are rejected by the endpoint's own auth.
+    """
+
+    def __init__(
+        self,
+        app,
+        paths: Tuple[str, ...] = ("/api/face/process-frame", "/api/face/detect"),
+        in_window: Callable[[str], bool] = lambda user_id: False
+    ):
+        self.app = app
+        self.paths = paths
+        self.in_window = in_window
+
+    def _user_id(self, scope) -> Optional[str]:
+        for key, value in scope.get("headers", []):
+            if key == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer":
+                    return None
+                try:
+                    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+                except JWTError:
+                    return None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        user_id = self._user_id(scope)
+        retry_after = None
+        if user_id is not None:
+            retry_after = frame_admission.admit(user_id, self.in_window(user_id))
+        if retry_after is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Too many frames, slow down"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
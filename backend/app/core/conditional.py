@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Optional, Tuple
+import hashlib
+from fastapi import Request, Response
+from app.core.database import get_analytics_collection
+
+PAST_CACHE_CONTROL = "private, max-age=86400"
+CURRENT_CACHE_CONTROL = "private, no-cache"
+
+async def history_etag(query: dict, *parts) -> Tuple[str, int]:
+    """
+    Cheap validator for a work-hours response built from the sessions
+    matching `query`. Only aggregates a handful of fields instead of
+    loading the sessions, plus the latest user profile change and user
+    count (names and shifts appear in the responses).
+    Returns: (etag, number of matching sessions not yet completed)
+    """
+    sessions_collection = get_analytics_collection("work_sessions")
+    users_collection = get_analytics_collection("users")
+
+    summary = None
+    async for summary in sessions_collection.aggregate([
+        {"$match": query},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "updated_at": {"$max": "$updated_at"},
+            "end_time": {"$max": "$end_time"},
+            "active": {"$sum": "$total_active_time"},
+            "open": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 0, 1]}}
+        }}
+    ]):
+        pass
+
+    latest_user = await users_collection.find_one(
+        {"updated_at": {"$exists": True}},
+        {"updated_at": 1},
+        sort=[("updated_at", -1)]
+    )
+    user_count = await users_collection.estimated_document_count()
+
+    fingerprint = repr((
+        sorted(query.items(), key=lambda item: item[0]),
+        parts,
+        summary and (summary["count"], summary["updated_at"], summary["end_time"], summary["active"], summary["open"]),
+        latest_user and latest_user["updated_at"],
+        user_count
+    ))
+    etag = 'W/"' + hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:20] + '"'
+    return etag, summary["open"] if summary else 0
+
+async def check_history_cache(
+    request: Request,
+    query: dict,
+    last_day: datetime
+) -> Tuple[Optional[Response], dict]:
+    """
+    Conditional GET for work-hours ranges ending on last_day.
+    Returns (304 response if the client's copy is current, headers for a full response)
+    """
+    etag, open_sessions = await history_etag(query, request.url.path, str(request.query_params))
+    # A session that started in the range may still be running (or be
+    # finalized later by the reaper), so only closed ranges are cached long
+    is_past = last_day.date() < datetime.utcnow().date() and open_sessions == 0
+    headers = {
+        "ETag": etag,
+        "Cache-Control": PAST_CACHE_CONTROL if is_past else CURRENT_CACHE_CONTROL
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers), headers
+
+    return None, headers
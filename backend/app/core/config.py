@@ -11,6 +11,20 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URL: str
     DB_NAME: str
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_IDLE_TIME_MS: int = 60000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 10000
+    MONGODB_SOCKET_TIMEOUT_MS: int = 20000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGODB_COMPRESSORS: str = "zlib"  # e.g. "zstd,snappy,zlib" if those libs are installed
+    
+    # MongoDB reporting/analytics reads
+    MONGODB_ANALYTICS_URL: Optional[str] = None  # defaults to MONGODB_URL
+    MONGODB_ANALYTICS_MAX_POOL_SIZE: int = 20
+    MONGODB_ANALYTICS_SOCKET_TIMEOUT_MS: int = 60000
+    MONGODB_ANALYTICS_READ_PREFERENCE: str = "secondaryPreferred"
     
     # Gemini AI
     GEMINI_API_KEY: str
@@ -19,6 +33,11 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     DEBUG: bool = True
+    # Deployment role: "all" serves everything; "api" skips the face/vision
+    # routes and background monitoring tasks and never imports OpenCV.
+    # Route /api/face, /api/work-sessions, /api/managers/live and
+    # /api/managers/team to "all" workers, which hold the monitoring state.
+    SERVICE_ROLE: str = "all"
     
     # Email
     MANAGER_EMAIL: str
@@ -29,12 +48,97 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str
     FROM_EMAIL: str
     FRONTEND_URL: str
+    SMTP_POOL_SIZE: int = 2  # connections reused across report emails
+    SMTP_IDLE_SECONDS: int = 60  # reconnect after a connection sat idle this long
+    SMTP_TIMEOUT_SECONDS: float = 30.0
+
+    # Scheduled team reports (cached in the reports collection)
+    REPORTS_ENABLED: bool = True
+    REPORTS_RUN_AT: str = "02:00"  # server local time, off-peak
+    REPORTS_WEEKLY_DAY: int = 0  # weekday (0 = Monday) the previous week's report is built
+    REPORTS_CONCURRENCY: int = 4  # teams built at once
+    REPORTS_SEND_EMAIL: bool = False
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
-    
+    PASSWORD_HASH_WORKERS: int = 4  # bcrypt thread pool size
+    PASSWORD_HASH_MAX_PENDING: int = 256  # reject logins beyond this many waiting hashes
+
+    # Frame triage (pre-detection filtering)
+    FRAME_TRIAGE_ENABLED: bool = True
+    FRAME_TRIAGE_THUMBNAIL_SIZE: int = 16
+    FRAME_TRIAGE_DIFF_THRESHOLD: float = 4.0  # mean abs diff on 0-255 scale
+    FRAME_TRIAGE_MIN_BRIGHTNESS: float = 40.0
+    FRAME_TRIAGE_MIN_SHARPNESS: float = 15.0  # variance of Laplacian
+    FRAME_TRIAGE_MAX_REUSE: int = 15  # force a fresh detection after this many reuses
+
+    # Frame admission control (token buckets, checked before the upload is read)
+    FRAME_ADMISSION_ENABLED: bool = True
+    FRAME_RATE_PER_USER: float = 1.0  # frames/s; the frontend sends one every 2 s
+    FRAME_BURST_PER_USER: float = 5.0
+    FRAME_RATE_GLOBAL: float = 200.0  # frames/s for the whole worker, 0 = unlimited
+    FRAME_BURST_GLOBAL: float = 400.0
+    FRAME_GLOBAL_RESERVE: float = 0.25  # share of the global burst users mid-window cannot take
+
+    # Face detector backend: haar, lbp, yunet or ssd
+    FACE_DETECTOR_BACKEND: str = "haar"
+    FACE_MODEL_DIR: str = "models"
+    FACE_LBP_CASCADE: str = "lbpcascade_frontalface_improved.xml"
+    FACE_YUNET_MODEL: str = "face_detection_yunet_2023mar.onnx"
+    FACE_SSD_PROTOTXT: str = "deploy.prototxt"
+    FACE_SSD_MODEL: str = "res10_300x300_ssd_iter_140000.caffemodel"
+    FACE_DNN_SCORE_THRESHOLD: float = 0.6
+    FACE_EYE_OPEN_CONTRAST: float = 35.0  # median - 5th percentile of the eye patch
+    FACE_UPLOAD_MAX_BYTES: int = 5 * 1024 * 1024
+
+    # Bulk onboarding
+    BULK_MAX_ROWS: int = 5000
+    BULK_UPLOAD_MAX_BYTES: int = 5 * 1024 * 1024
+    BULK_FACE_ZIP_MAX_BYTES: int = 200 * 1024 * 1024
+    BULK_FACE_WORKERS: int = 4  # images enrolled concurrently
+
+    # Recorded video audits
+    VIDEO_AUDIT_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    VIDEO_AUDIT_SAMPLE_FPS: float = 0.5  # the frontend sends a frame every 2 s
+    VIDEO_AUDIT_WORKERS: int = 4
+    VIDEO_AUDIT_CHUNK_FRAMES: int = 16
+
+    # Out-of-process vision workers (0 runs detection in the API process)
+    VISION_WORKERS: int = 0
+    VISION_SHM_SLOT_BYTES: int = 1920 * 1080 * 3  # largest frame sent to a worker
+    VISION_JOB_TIMEOUT_SECONDS: float = 5.0
+
+    # Monitoring session reaper
+    SESSION_IDLE_TIMEOUT_SECONDS: int = 300  # no frames for this long ends the session
+    SESSION_REAPER_INTERVAL_SECONDS: int = 30
+
+    # Retention: completed sessions older than this are archived and compacted
+    RETENTION_COMPACT_AFTER_DAYS: int = 180
+    RETENTION_ARCHIVE_DIR: str = "archive"
+    RETENTION_BATCH_SIZE: int = 500
+    RETENTION_RESTORE_GRACE_DAYS: int = 30  # restored sessions stay uncompacted this long
+    RETENTION_SUMMARY_TTL_DAYS: int = 0  # >0 deletes compacted summaries this long after compaction
+
+    # Maintenance CLI (maintenance.py): batch size and minimum pause between batches
+    MAINTENANCE_BATCH_SIZE: int = 500
+    MAINTENANCE_BATCH_PAUSE_MS: int = 200
+    MAINTENANCE_FILE_GRACE_SECONDS: int = 3600  # newer upload files are never purged
+
+    # Live team status feed
+    LIVE_FEED_QUEUE_SIZE: int = 100  # per subscriber, oldest events dropped beyond this
+    LIVE_FEED_KEEPALIVE_SECONDS: int = 15
+    PREVIEW_MAX_VIEWERS_PER_USER: int = 5  # MJPEG previews of one employee
+
+    # Sampling profiler (off unless a rate or token is set)
+    PROFILER_SAMPLE_RATE: float = 0.0  # fraction of PROFILER_PATHS requests to profile
+    PROFILER_PATHS: str = "/api/face/process-frame,/api/admin"
+    PROFILER_TOKEN: str = ""  # X-Profile header value that forces profiling
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_DIR: str = "profiles"
+    PROFILER_MAX_FILES: int = 50
+
     class Config:
         env_file = str(ENV_FILE)
         env_file_encoding = 'utf-8'
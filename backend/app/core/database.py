@@ -4,16 +4,87 @@ from typing import Optional
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
+    # Separate pool for reporting scans so they cannot starve session writes
+    analytics_client: Optional[AsyncIOMotorClient] = None
 
 db = Database()
 
+def _client_options(max_pool_size: int, socket_timeout_ms: int) -> dict:
+    options = {
+        "maxPoolSize": max_pool_size,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": socket_timeout_ms,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+    }
+    if settings.MONGODB_COMPRESSORS:
+        options["compressors"] = settings.MONGODB_COMPRESSORS
+    return options
+
 async def connect_to_mongo():
     """Connect to MongoDB"""
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db.client = AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        **_client_options(settings.MONGODB_MAX_POOL_SIZE, settings.MONGODB_SOCKET_TIMEOUT_MS)
+    )
+    db.analytics_client = AsyncIOMotorClient(
+        settings.MONGODB_ANALYTICS_URL or settings.MONGODB_URL,
+        readPreference=settings.MONGODB_ANALYTICS_READ_PREFERENCE,
+        **_client_options(
+            settings.MONGODB_ANALYTICS_MAX_POOL_SIZE,
+            settings.MONGODB_ANALYTICS_SOCKET_TIMEOUT_MS
+        )
+    )
+    await ensure_indexes()
     print("✅ Connected to MongoDB")
 
+async def ensure_indexes():
+    """Create indexes used by the hot queries (no-op if they exist)"""
+    await get_collection("work_sessions").create_index([("start_time", 1), ("user_id", 1)])
+    await get_collection("work_sessions").create_index([("user_id", 1), ("status", 1)])
+    await get_collection("users").create_index([("updated_at", -1)])
+    # Shift start claims only matter around the boundary they were made for
+    await get_collection("shift_claims").create_index([("claimed_at", 1)], expireAfterSeconds=2 * 86400)
+    # Heartbeats of monitoring processes; long-gone processes drop out
+    await get_collection("monitor_heartbeats").create_index([("at", 1)], expireAfterSeconds=86400)
+    await _ensure_summary_ttl()
+
+async def _ensure_summary_ttl():
+    """
+    Expire compacted session summaries after RETENTION_SUMMARY_TTL_DAYS.
+    create_index cannot change the TTL of an existing index (it raises
+    IndexOptionsConflict), so a changed setting is applied with collMod,
+    and setting it to 0 drops the index.
+    """
+    sessions_collection = get_collection("work_sessions")
+    existing = next(
+        (
+            (name, info) for name, info in (await sessions_collection.index_information()).items()
+            if info["key"] == [("compacted_at", 1)]
+        ),
+        None
+    )
+    expire_after = settings.RETENTION_SUMMARY_TTL_DAYS * 86400
+
+    if expire_after <= 0:
+        if existing is not None:
+            await sessions_collection.drop_index(existing[0])
+    elif existing is None:
+        # Only compacted summaries carry compacted_at, so live data is never expired
+        await sessions_collection.create_index([("compacted_at", 1)], expireAfterSeconds=expire_after)
+    elif existing[1].get("expireAfterSeconds") != expire_after:
+        await get_database().command(
+            "collMod",
+            "work_sessions",
+            index={"keyPattern": {"compacted_at": 1}, "expireAfterSeconds": expire_after}
+        )
+
 async def close_mongo_connection():
     """Close MongoDB connection"""
+    if db.analytics_client:
+        db.analytics_client.close()
     if db.client:
         db.client.close()
         print("❌ Closed MongoDB connection")
@@ -26,3 +97,10 @@ def get_collection(collection_name: str):
     """Get collection from database"""
     database = get_database()
     return database[collection_name]
+
+def get_analytics_collection(collection_name: str):
+    """
+    Get collection for reporting queries (own pool, secondary-preferred
+    reads - results may lag the primary slightly)
+    """
+    return db.analytics_client[settings.DB_NAME][collection_name]
@@ -0,0 +1,170 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import os
+import random
+import re
+import sys
+import threading
+import time
+from app.core.config import settings
+
+class StackSampler:
+    """
+    Low-overhead wall-clock sampling profiler. A background thread grabs
+    the target thread's current stack every `interval` seconds and counts
+    identical stacks, producing folded ("collapsed") output that flamegraph
+    tools read directly.
+
+    Samples are loop-wide: the event loop thread also runs other requests
+    and background tasks while the profiled one awaits. Given the loop and
+    the profiled task, each stack is rooted at "[request]" when that task
+    was running, "[other task]" for any other task and "[loop]" for the
+    loop itself (callbacks, waiting for I/O). Work the request hands to
+    child tasks is counted as "[other task]", and work it runs in the
+    threadpool is not sampled.
+    """
+
+    def __init__(
+        self,
+        thread_id: int,
+        interval: float,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        task: Optional[asyncio.Task] = None
+    ):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.loop = loop
+        self.task = task
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _fold(self, frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _owner(self) -> str:
+        current = asyncio.current_task(self.loop)
+        if current is None:
+            return "[loop]"
+        return "[request]" if current is self.task else "[other task]"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = self._fold(frame)
+            if self.loop is not None:
+                stack = f"{self._owner()};{stack}"
+            self.samples[stack] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+class ProfileStore:
+    """Bounded on-disk ring of folded profiles; oldest files are evicted"""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+        os.makedirs(self.directory, exist_ok=True)
+
+    def list(self) -> List[dict]:
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".folded"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            profiles.append({
+                "name": name,
+                "size": stat.st_size,
+                "created_at": datetime.utcfromtimestamp(stat.st_mtime)
+            })
+        return sorted(profiles, key=lambda p: p["name"], reverse=True)
+
+    def path(self, name: str) -> Optional[str]:
+        """Path of a stored profile, or None for unknown names"""
+        if os.path.basename(name) != name or not name.endswith(".folded"):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def save(self, label: str, samples: Counter):
+        name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}_{label}.folded"
+        with open(os.path.join(self.directory, name), "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        profiles = self.list()
+        for old in profiles[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, old["name"]))
+            except FileNotFoundError:
+                pass
+
+profile_store = ProfileStore(settings.PROFILER_DIR, settings.PROFILER_MAX_FILES)
+
+class ProfilerMiddleware:
+    """
+    Profiles a request when it is randomly sampled (only for
+    PROFILER_PATHS) or when it carries the X-Profile header with the
+    admin-only PROFILER_TOKEN. One request is profiled at a time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.sample_rate = settings.PROFILER_SAMPLE_RATE
+        self.token = settings.PROFILER_TOKEN
+        self.paths = tuple(p.strip() for p in settings.PROFILER_PATHS.split(",") if p.strip())
+        self.interval = settings.PROFILER_INTERVAL_MS / 1000
+        self._busy = False
+
+    def _wants_profile(self, scope) -> bool:
+        if self.token:
+            for key, value in scope.get("headers", []):
+                if key == b"x-profile":
+                    return value.decode("latin-1") == self.token
+        return (
+            self.sample_rate > 0
+            and scope["path"].startswith(self.paths)
+            and random.random() < self.sample_rate
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        sampler = StackSampler(
+            threading.get_ident(),
+            self.interval,
+            loop=asyncio.get_running_loop(),
+            task=asyncio.current_task()
+        )
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            # Joining the sampler waits up to one interval; keep that off the loop
+            samples = await run_in_threadpool(sampler.stop)
+            self._busy = False
+            path = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-")
+            label = f"{scope['method']}_{path}_{elapsed_ms}ms"
+            if samples:
+                await run_in_threadpool(profile_store.save, label, samples)
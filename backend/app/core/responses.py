@@ -0,0 +1,51 @@
+from typing import Any, Type
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def _default(obj: Any):
+    """orjson fallback for types it does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes with ObjectId/datetime/NumPy support"""
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+class MongoJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson. Handles datetime and NumPy values
+    natively and ObjectId through a fallback, so raw Mongo documents can be
+    returned without a jsonable_encoder pass.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def trusted_payload(model: Type[BaseModel], document: dict) -> dict:
+    """
+    Shape a document we wrote ourselves like `model` without validating it.
+    Only picks the model's fields; missing optional fields get their default.
+    """
+    return {
+        name: document[name] if name in document else field.get_default(call_default_factory=True)
+        for name, field in model.model_fields.items()
+    }
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose names are content hashes, served with far-future caching"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
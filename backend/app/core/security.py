@@ -1,25 +1,116 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
 from jose import JWTError, jwt
 import bcrypt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
 from app.core.database import get_collection
 from bson import ObjectId
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password"""
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded thread pool so hashing never blocks the event
+    loop. Requests beyond max_pending are rejected up front instead of
+    queueing without limit, so a login storm degrades login latency only.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0  # only touched from the event loop thread
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+    
+    async def run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "2"}
+            )
+        
+        def job():
+            started = time.perf_counter()
+            result = fn(*args)
+            return started, time.perf_counter(), result
+        
+        self._pending += 1
+        queued_at = time.perf_counter()
+        try:
+            started, finished, result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, job
+            )
+        finally:
+            self._pending -= 1
+        
+        wait = started - queued_at
+        self._completed += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._total_run += finished - started
+        return result
+    
+    def stats(self) -> dict:
+        """Queueing metrics for the hashing pool"""
+        completed = self._completed or 1
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._pending,
+            "queued": max(self._pending - self.workers, 0),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._total_wait / completed * 1000, 2),
+            "max_wait_ms": round(self._max_wait * 1000, 2),
+            "avg_hash_ms": round(self._total_run / completed * 1000, 2)
+        }
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-def get_password_hash(password: str) -> str:
-    """Hash password"""
+def _hash_password_sync(password: str) -> str:
     salt = bcrypt.gensalt()
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify password (off the event loop)"""
+    return await password_hasher.run(_verify_password_sync, plain_password, hashed_password)
+
+async def get_password_hash(password: str) -> str:
+    """Hash password (off the event loop)"""
+    return await password_hasher.run(_hash_password_sync, password)
+
+async def get_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    Hash many passwords in parallel, keeping at most one per hashing worker
+    in flight so bulk jobs never push logins past max_pending
+    """
+    limit = asyncio.Semaphore(password_hasher.workers)
+    
+    async def hash_one(password: str) -> str:
+        async with limit:
+            return await get_password_hash(password)
+    
+    return list(await asyncio.gather(*(hash_one(p) for p in passwords)))
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -31,13 +122,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Get current user from token"""
+async def _user_from_token(token: Optional[str]):
+    """Resolve a JWT to its user document"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
@@ -52,15 +145,33 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """Get current user from token"""
+    return await _user_from_token(token)
+
+async def get_stream_user(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme_optional)
+):
+    """
+    Get current user for streaming endpoints. Browsers' EventSource cannot
+    set headers, so the token may also come as ?access_token=
+    """
+    return await _user_from_token(token or request.query_params.get("access_token"))
+
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
     """Get current active user"""
     if not current_user.get("is_active", True):
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def require_role(allowed_roles: list):
+async def get_stream_active_user(current_user: dict = Depends(get_stream_user)):
+    """Get current active user for streaming endpoints"""
+    return await get_current_active_user(current_user)
+
+def require_role(allowed_roles: list, user_dependency=get_current_active_user):
     """Decorator to require specific roles"""
-    async def role_checker(current_user: dict = Depends(get_current_active_user)):
+    async def role_checker(current_user: dict = Depends(user_dependency)):
         if current_user.get("role") not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -31,6 +31,7 @@ class UserResponse(UserBase):
     manager_id: Optional[str] = None
     shift_start: Optional[str] = None
     shift_end: Optional[str] = None
+    face_images: Optional[Dict[str, str]] = None  # variant -> image path
     
     class Config:
         from_attributes = True
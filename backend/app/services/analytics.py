@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+from typing import List, Tuple
+import numpy as np
+from app.core.database import get_analytics_collection
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MAX_RANGE_DAYS = 366
+MAX_TIMELINE_CELLS = 5_000_000  # users x buckets returned by one timeline
+
+# Parallel arrays describing presence windows: (row, start_epoch_s, end_epoch_s)
+Windows = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def parse_date_range(start_date: str, end_date: str) -> Tuple[datetime, datetime]:
+    """
+    Parse an inclusive YYYY-MM-DD range
+    Returns: (start, end) with end at the following midnight
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    if end <= start:
+        raise ValueError("end_date is before start_date")
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f"Range longer than {MAX_RANGE_DAYS} days")
+    return start, end
+
+def sessions_query(user_ids: List[str], start: datetime, end: datetime) -> dict:
+    """Sessions that can hold logs inside [start, end) - they never span more than a day"""
+    return {
+        "start_time": {"$gte": start - timedelta(days=1), "$lt": end},
+        "user_id": {"$in": user_ids}
+    }
+
+def _epoch(moment: datetime) -> float:
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+def presence(
+    windows: Windows,
+    n_rows: int,
+    range_start: datetime,
+    n_buckets: int,
+    bucket_seconds: int
+) -> np.ndarray:
+    """Seconds of presence per (row, bucket), computed without a Python loop"""
+    rows, starts, ends = windows
+    origin = _epoch(range_start)
+    span = n_buckets * bucket_seconds
+
+    # Range-relative seconds, clipped to the range
+    s = np.clip(starts - origin, 0, span)
+    e = np.clip(ends - origin, 0, span)
+    keep = e > s
+    rows, s, e = rows[keep], s[keep], e[keep]
+
+    first = np.minimum((s // bucket_seconds).astype(np.int64), n_buckets - 1)
+    last = np.minimum((e // bucket_seconds).astype(np.int64), n_buckets - 1)
+    same = first == last
+    split = ~same
+
+    # Work on a flat (row, bucket) grid one column wider, so last + 1 fits;
+    # bincount is the fast unbuffered scatter-add
+    width = n_buckets + 1
+    size = n_rows * width
+    base = rows * width
+
+    def scatter(index, weights):
+        return np.bincount(index, weights=weights, minlength=size)
+
+    # Whole buckets covered by a window: difference array, then cumsum
+    spans = split & (last > first + 1)
+    full = scatter(base[spans] + first[spans] + 1, np.full(spans.sum(), float(bucket_seconds)))
+    full -= scatter(base[spans] + last[spans], np.full(spans.sum(), float(bucket_seconds)))
+    result = np.cumsum(full.reshape(n_rows, width), axis=1)
+
+    # Windows inside one bucket, then the head and tail of spanning windows
+    partial = scatter(base[same] + first[same], e[same] - s[same])
+    partial += scatter(base[split] + first[split], (first[split] + 1) * bucket_seconds - s[split])
+    partial += scatter(base[split] + last[split], e[split] - last[split] * bucket_seconds)
+    result = (result + partial.reshape(n_rows, width))[:, :n_buckets]
+
+    # Overlapping windows must not count a bucket twice
+    return np.minimum(result, bucket_seconds)
+
+class AnalyticsService:
+    """Presence timelines and utilisation heatmaps built from eye detection logs"""
+
+    async def load_windows(
+        self,
+        user_ids: List[str],
+        start: datetime,
+        end: datetime
+    ) -> Windows:
+        """
+        Fetch logged eye detection windows overlapping [start, end)
+        Rows index into user_ids. Each log marks the end of a window of
+        `duration` seconds.
+        """
+        sessions_collection = get_analytics_collection("work_sessions")
+        pipeline = [
+            {"$match": sessions_query(user_ids, start, end)},
+            {"$project": {
+                "_id": 0,
+                "user_id": 1,
+                "t": {"$map": {
+                    "input": {"$ifNull": ["$eye_detection_logs", []]},
+                    "as": "log",
+                    "in": {"$toLong": "$$log.timestamp"}
+                }},
+                "d": {"$ifNull": ["$eye_detection_logs.duration", []]}
+            }}
+        ]
+
+        index = {uid: row for row, uid in enumerate(user_ids)}
+        rows, stamps, durations = [], [], []
+        async for doc in sessions_collection.aggregate(pipeline):
+            if not doc["t"]:
+                continue
+            rows.append(np.full(len(doc["t"]), index[doc["user_id"]], dtype=np.int64))
+            stamps.append(np.asarray(doc["t"], dtype=np.int64))
+            durations.append(np.asarray(doc["d"], dtype=np.float64))
+
+        if not rows:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty
+
+        ends = np.concatenate(stamps) / 1000.0
+        return np.concatenate(rows), ends - np.concatenate(durations), ends
+
+    async def timeline(
+        self,
+        user_ids: List[str],
+        start: datetime,
+        end: datetime,
+        bucket_minutes: int = 1
+    ) -> dict:
+        """Per-user presence seconds per bucket over [start, end)"""
+        bucket_seconds = bucket_minutes * 60
+        n_buckets = -(-int((end - start).total_seconds()) // bucket_seconds)
+        if len(user_ids) * n_buckets > MAX_TIMELINE_CELLS:
+            raise ValueError("Range too long for this bucket size; use larger buckets")
+        windows = await self.load_windows(user_ids, start, end)
+        matrix = presence(windows, len(user_ids), start, n_buckets, bucket_seconds)
+
+        return {
+            "start": start,
+            "end": end,
+            "bucket_minutes": bucket_minutes,
+            "users": [
+                {
+                    "user_id": uid,
+                    "active_seconds": int(row.sum()),
+                    "presence": row.astype(np.int32)
+                }
+                for uid, row in zip(user_ids, matrix)
+            ]
+        }
+
+    async def heatmap(
+        self,
+        user_ids: List[str],
+        start: datetime,
+        end: datetime
+    ) -> dict:
+        """
+        Team utilisation by weekday x hour-of-day over [start, end)
+        Utilisation is presence divided by (team size x hours in that slot).
+        """
+        n_hours = int((end - start).total_seconds()) // 3600
+        windows = await self.load_windows(user_ids, start, end)
+        # Hourly buckets are all the heatmap needs; sum the team afterwards
+        hourly = presence(windows, len(user_ids), start, n_hours, 3600).sum(axis=0)
+
+        hours = np.arange(n_hours)
+        slot = ((start.weekday() + (start.hour + hours) // 24) % 7) * 24 + (start.hour + hours) % 24
+        active = np.bincount(slot, weights=hourly, minlength=168).reshape(7, 24)
+        capacity = np.bincount(slot, minlength=168).reshape(7, 24) * 3600 * max(len(user_ids), 1)
+
+        utilisation = np.divide(active, capacity, out=np.zeros_like(active), where=capacity > 0)
+        return {
+            "start": start,
+            "end": end,
+            "users": len(user_ids),
+            "weekdays": WEEKDAYS,
+            "active_hours": np.round(active / 3600, 2),
+            "utilisation": np.round(utilisation, 4)
+        }
+
+# Global instance
+analytics_service = AnalyticsService()
@@ -0,0 +1,267 @@
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+import os
+from typing import Dict, List, Tuple, Type
+from app.core.config import settings
+
+# (face_detected, eyes_detected, confidence, regions)
+# regions is a list of (face_box, eye_boxes) with eye boxes relative to the face
+DetectionResult = Tuple[bool, bool, float, List[tuple]]
+
+def _model_path(filename: str) -> str:
+    """Resolve a model file inside the configured model directory"""
+    return os.path.join(settings.FACE_MODEL_DIR, filename)
+
+def _load_cascade(path: str) -> cv2.CascadeClassifier:
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise RuntimeError(f"Could not load cascade classifier: {path}")
+    return cascade
+
+def _find_eyes(eye_cascade: cv2.CascadeClassifier, gray: np.ndarray, box: tuple) -> List[tuple]:
+    """Run the eye cascade inside a face box"""
+    x, y, w, h = box
+    roi_gray = gray[y:y+h, x:x+w]
+    if roi_gray.size == 0:
+        return []
+    eyes = eye_cascade.detectMultiScale(
+        roi_gray,
+        scaleFactor=1.1,
+        minNeighbors=5,
+        minSize=(20, 20)
+    )
+    return [tuple(int(v) for v in e) for e in eyes]
+
+class FaceDetector(ABC):
+    """Base interface for face/eye detector backends"""
+    name = "base"
+
+    @abstractmethod
+    def detect_faces(self, frame: np.ndarray) -> List[tuple]:
+        """Return face boxes as (x, y, w, h)"""
+
+    @abstractmethod
+    def detect_regions(self, frame: np.ndarray) -> DetectionResult:
+        """Detect faces and check for open eyes"""
+
+class CascadeDetector(FaceDetector):
+    """Cascade classifier face detector with a Haar eye cascade on each face"""
+    name = "cascade"
+
+    def __init__(self, face_cascade_path: str, eye_cascade_path: str):
+        self.face_cascade = _load_cascade(face_cascade_path)
+        self.eye_cascade = _load_cascade(eye_cascade_path)
+
+    def _faces(self, gray: np.ndarray) -> List[tuple]:
+        faces = self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(30, 30)
+        )
+        return [tuple(int(v) for v in f) for f in faces]
+
+    def detect_faces(self, frame: np.ndarray) -> List[tuple]:
+        return self._faces(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+    def detect_regions(self, frame: np.ndarray) -> DetectionResult:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = self._faces(gray)
+
+        face_detected = len(faces) > 0
+        eyes_detected = False
+        confidence = 0.8 if face_detected else 0.0  # Base confidence for face detection
+        regions = []
+
+        for box in faces:
+            if eyes_detected:
+                # Eyes already found, keep remaining faces for annotation only
+                regions.append((box, []))
+                continue
+
+            eyes = _find_eyes(self.eye_cascade, gray, box)
+            regions.append((box, eyes))
+
+            if len(eyes) >= 2:  # At least 2 eyes detected
+                eyes_detected = True
+                confidence = 0.95
+
+        return face_detected, eyes_detected, confidence, regions
+
+class HaarDetector(CascadeDetector):
+    """Default backend: Haar face and eye cascades bundled with OpenCV"""
+    name = "haar"
+
+    def __init__(self):
+        super().__init__(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml',
+            cv2.data.haarcascades + 'haarcascade_eye.xml'
+        )
+
+class LBPDetector(CascadeDetector):
+    """LBP face cascade (faster, slightly less accurate) with the Haar eye cascade"""
+    name = "lbp"
+
+    def __init__(self):
+        super().__init__(
+            _model_path(settings.FACE_LBP_CASCADE),
+            cv2.data.haarcascades + 'haarcascade_eye.xml'
+        )
+
+class YuNetDetector(FaceDetector):
+    """
+    OpenCV DNN YuNet face detector
+    Uses the eye landmarks YuNet returns to check that eyes are open instead
+    of running an eye cascade.
+    """
+    name = "yunet"
+
+    def __init__(self):
+        self.score_threshold = settings.FACE_DNN_SCORE_THRESHOLD
+        self.eye_open_contrast = settings.FACE_EYE_OPEN_CONTRAST
+        self._detector = cv2.FaceDetectorYN.create(
+            _model_path(settings.FACE_YUNET_MODEL),
+            "",
+            (320, 320),
+            self.score_threshold,
+            0.3,
+            5000
+        )
+        self._input_size = (320, 320)
+
+    def _detect(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        if self._input_size != (w, h):
+            self._detector.setInputSize((w, h))
+            self._input_size = (w, h)
+        _, faces = self._detector.detect(frame)
+        return faces if faces is not None else np.empty((0, 15), dtype=np.float32)
+
+    def _eye_box(self, gray: np.ndarray, cx: float, cy: float, face_w: int) -> tuple:
+        """Square patch centred on an eye landmark, in frame coordinates"""
+        half = max(int(face_w * 0.12), 4)
+        x0 = max(int(cx) - half, 0)
+        y0 = max(int(cy) - half, 0)
+        x1 = min(int(cx) + half, gray.shape[1])
+        y1 = min(int(cy) + half, gray.shape[0])
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _eye_is_open(self, gray: np.ndarray, box: tuple) -> bool:
+        """
+        An open eye shows a dark pupil/iris against the sclera and lids,
+        a closed eye is mostly uniform skin. Compare the darkest pixels in
+        the patch against its median.
+        """
+        x, y, w, h = box
+        patch = gray[y:y+h, x:x+w]
+        if patch.size == 0:
+            return False
+        return float(np.median(patch) - np.percentile(patch, 5)) >= self.eye_open_contrast
+
+    def detect_faces(self, frame: np.ndarray) -> List[tuple]:
+        return [tuple(int(v) for v in f[:4]) for f in self._detect(frame)]
+
+    def detect_regions(self, frame: np.ndarray) -> DetectionResult:
+        faces = self._detect(frame)
+        if len(faces) == 0:
+            return False, False, 0.0, []
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        eyes_detected = False
+        confidence = 0.0
+        regions = []
+
+        for f in faces:
+            x, y, w, h = (int(v) for v in f[:4])
+            confidence = max(confidence, float(f[14]))
+
+            open_eyes = []
+            # Landmarks 4-7 are right eye (x, y) and left eye (x, y)
+            for cx, cy in ((f[4], f[5]), (f[6], f[7])):
+                ex, ey, ew, eh = self._eye_box(gray, cx, cy, w)
+                if self._eye_is_open(gray, (ex, ey, ew, eh)):
+                    open_eyes.append((ex - x, ey - y, ew, eh))
+
+            regions.append(((x, y, w, h), open_eyes))
+            if len(open_eyes) >= 2:
+                eyes_detected = True
+
+        return True, eyes_detected, confidence, regions
+
+class Res10SSDDetector(FaceDetector):
+    """OpenCV DNN res10 SSD face detector with the Haar eye cascade on each face"""
+    name = "ssd"
+
+    def __init__(self):
+        self.score_threshold = settings.FACE_DNN_SCORE_THRESHOLD
+        self._net = cv2.dnn.readNetFromCaffe(
+            _model_path(settings.FACE_SSD_PROTOTXT),
+            _model_path(settings.FACE_SSD_MODEL)
+        )
+        self.eye_cascade = _load_cascade(cv2.data.haarcascades + 'haarcascade_eye.xml')
+
+    def _detect(self, frame: np.ndarray) -> List[Tuple[tuple, float]]:
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(
+            cv2.resize(frame, (300, 300)),
+            1.0,
+            (300, 300),
+            (104.0, 177.0, 123.0)
+        )
+        self._net.setInput(blob)
+        detections = self._net.forward()
+
+        faces = []
+        for i in range(detections.shape[2]):
+            score = float(detections[0, 0, i, 2])
+            if score < self.score_threshold:
+                continue
+            x0, y0, x1, y1 = (detections[0, 0, i, 3:7] * np.array([w, h, w, h])).astype(int)
+            x0, y0 = max(x0, 0), max(y0, 0)
+            x1, y1 = min(x1, w), min(y1, h)
+            if x1 > x0 and y1 > y0:
+                faces.append(((int(x0), int(y0), int(x1 - x0), int(y1 - y0)), score))
+        return faces
+
+    def detect_faces(self, frame: np.ndarray) -> List[tuple]:
+        return [box for box, _ in self._detect(frame)]
+
+    def detect_regions(self, frame: np.ndarray) -> DetectionResult:
+        faces = self._detect(frame)
+        if not faces:
+            return False, False, 0.0, []
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        eyes_detected = False
+        confidence = max(score for _, score in faces)
+        regions = []
+
+        for box, _ in faces:
+            if eyes_detected:
+                regions.append((box, []))
+                continue
+            eyes = _find_eyes(self.eye_cascade, gray, box)
+            regions.append((box, eyes))
+            if len(eyes) >= 2:
+                eyes_detected = True
+
+        return True, eyes_detected, confidence, regions
+
+DETECTOR_BACKENDS: Dict[str, Type[FaceDetector]] = {
+    HaarDetector.name: HaarDetector,
+    LBPDetector.name: LBPDetector,
+    YuNetDetector.name: YuNetDetector,
+    Res10SSDDetector.name: Res10SSDDetector,
+}
+
+def create_detector(backend: str) -> FaceDetector:
+    """Instantiate a detector backend by name"""
+    try:
+        detector_cls = DETECTOR_BACKENDS[backend.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown face detector backend '{backend}'. "
+            f"Choose one of: {', '.join(DETECTOR_BACKENDS)}"
+        )
+    return detector_cls()
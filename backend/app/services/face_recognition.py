@@ -1,72 +1,59 @@
 import cv2
 import numpy as np
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List
 import os
+from io import BytesIO
+from app.core.config import settings
+from app.core.storage import atomic_write
+from app.services.detectors import create_detector
 # import face_recognition  # Optional - requires dlib which can be complex on Windows
-
 class FaceRecognitionService:
-    def __init__(self):
-        # Load Haar Cascades for face and eye detection
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        self.eye_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_eye.xml'
-        )
+    def __init__(self, backend: str = settings.FACE_DETECTOR_BACKEND):
+        # Face/eye detector backend (haar, lbp, yunet, ssd), loaded on first use
+        self.backend = backend
+        self._detector = None
         self.face_encodings_dir = "uploads/faces"
         os.makedirs(self.face_encodings_dir, exist_ok=True)
     
+    @property
+    def detector(self):
+        """Detector backend; classifiers/models are only loaded when first needed"""
+        if self._detector is None:
+            self._detector = create_detector(self.backend)
+        return self._detector
+    
     def detect_face_and_eyes(self, frame: np.ndarray) -> Tuple[bool, bool, float]:
         """
         Detect face and eyes in frame
         Returns: (face_detected, eyes_detected, confidence)
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Detect faces
-        faces = self.face_cascade.detectMultiScale(
-            gray, 
-            scaleFactor=1.1, 
-            minNeighbors=5, 
-            minSize=(30, 30)
-        )
-        
-        face_detected = len(faces) > 0
-        eyes_detected = False
-        confidence = 0.0
-        
-        if face_detected:
-            confidence = 0.8  # Base confidence for face detection
-            
-            # Check for eyes in each face
-            for (x, y, w, h) in faces:
-                roi_gray = gray[y:y+h, x:x+w]
-                eyes = self.eye_cascade.detectMultiScale(
-                    roi_gray,
-                    scaleFactor=1.1,
-                    minNeighbors=5,
-                    minSize=(20, 20)
-                )
-                
-                if len(eyes) >= 2:  # At least 2 eyes detected
-                    eyes_detected = True
-                    confidence = 0.95
-                    break
-        
+        face_detected, eyes_detected, confidence, _ = self.detect_regions(frame)
         return face_detected, eyes_detected, confidence
     
+    def detect_regions(self, frame: np.ndarray) -> Tuple[bool, bool, float, List[tuple]]:
+        """
+        Detect face and eyes in frame, keeping the detected boxes
+        Returns: (face_detected, eyes_detected, confidence, regions)
+        where regions is a list of (face_box, eye_boxes)
+        """
+        return self.detector.detect_regions(frame)
+    
     def encode_face(self, image_path: str) -> Optional[np.ndarray]:
         """
         Encode face from image for recognition
         Note: Basic implementation without face_recognition library
         """
+        image = cv2.imread(image_path)
+        if image is None:
+            return None
+        return self.encode_face_image(image)
+    
+    def encode_face_image(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Encode face from an already decoded image
+        """
         try:
-            image = cv2.imread(image_path)
-            if image is None:
-                return None
-            
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))
+            faces = self.detector.detect_faces(image)
             
             if len(faces) > 0:
                 # Return the face region as a simple "encoding"
@@ -85,7 +72,9 @@ class FaceRecognitionService:
         Save face encoding for a user
         """
         encoding_path = os.path.join(self.face_encodings_dir, f"{user_id}.npy")
-        np.save(encoding_path, encoding)
+        buffer = BytesIO()
+        np.save(buffer, encoding)
+        atomic_write(encoding_path, buffer.getvalue())
     
     def load_face_encoding(self, user_id: str) -> Optional[np.ndarray]:
         """
@@ -108,8 +97,7 @@ class FaceRecognitionService:
                 return False
             
             # Detect face in current frame
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))
+            faces = self.detector.detect_faces(frame)
             
             if len(faces) == 0:
                 return False
@@ -147,17 +135,17 @@ class FaceRecognitionService:
         """
         Draw detection boxes on frame for visualization
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))
-        
-        for (x, y, w, h) in faces:
+        _, _, _, regions = self.detect_regions(frame)
+        return self.draw_regions(frame, regions)
+    
+    def draw_regions(self, frame: np.ndarray, regions: List[tuple]) -> np.ndarray:
+        """
+        Draw already detected face/eye boxes on frame
+        """
+        for (x, y, w, h), eyes in regions:
             # Draw face rectangle
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
             
-            # Detect eyes in face region
-            roi_gray = gray[y:y+h, x:x+w]
-            eyes = self.eye_cascade.detectMultiScale(roi_gray, 1.1, 5, minSize=(20, 20))
-            
             for (ex, ey, ew, eh) in eyes:
                 cv2.rectangle(
                     frame, 
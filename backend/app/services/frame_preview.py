@@ -0,0 +1,87 @@
+from typing import Dict, Optional, Set
+import asyncio
+from app.core.config import settings
+
+class Viewer:
+    """
+    One open preview stream. Holds only the newest frame: a viewer that
+    falls behind skips to the latest one instead of queueing.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.frame: Optional[bytes] = None
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, frame: bytes):
+        if self.ready.is_set():
+            self.dropped += 1
+        self.frame = frame
+        self.ready.set()
+
+    async def next_frame(self, timeout: float) -> Optional[bytes]:
+        """Wait for a frame newer than the last one taken; None on timeout"""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.ready.clear()
+        self.sent += 1
+        return self.frame
+
+class FramePreview:
+    """
+    In-process fan-out of employees' annotated JPEG frames to watching
+    managers. Publishing hands the same encoded bytes to every viewer and
+    is a single dict lookup when nobody watches that employee.
+    """
+
+    def __init__(self, max_viewers: int = settings.PREVIEW_MAX_VIEWERS_PER_USER):
+        self.max_viewers = max_viewers
+        self._viewers: Dict[str, Set[Viewer]] = {}
+        self.published = 0
+
+    def watching(self, user_id: str) -> bool:
+        """Whether anyone watches user_id; lets callers skip preparing a frame"""
+        return user_id in self._viewers
+
+    def subscribe(self, user_id: str) -> Optional[Viewer]:
+        """Open a preview of user_id, or None if it already has max_viewers"""
+        viewers = self._viewers.setdefault(user_id, set())
+        if len(viewers) >= self.max_viewers:
+            return None
+        viewer = Viewer(user_id)
+        viewers.add(viewer)
+        return viewer
+
+    def unsubscribe(self, viewer: Viewer):
+        viewers = self._viewers.get(viewer.user_id)
+        if viewers is None:
+            return
+        viewers.discard(viewer)
+        if not viewers:
+            del self._viewers[viewer.user_id]
+
+    def publish(self, user_id: str, frame: bytes):
+        """Send an encoded frame of user_id to everyone watching it"""
+        viewers = self._viewers.get(user_id)
+        if not viewers:
+            return
+        for viewer in viewers:
+            viewer.offer(frame)
+        self.published += 1
+
+    def stats(self) -> dict:
+        viewers = [v for group in self._viewers.values() for v in group]
+        return {
+            "watched_users": len(self._viewers),
+            "viewers": len(viewers),
+            "published": self.published,
+            "sent": sum(v.sent for v in viewers),
+            "dropped": sum(v.dropped for v in viewers)
+        }
+
+# Global instance
+frame_preview = FramePreview()
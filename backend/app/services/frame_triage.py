@@ -0,0 +1,124 @@
+import cv2
+import numpy as np
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+# Verdicts returned by FrameTriage.assess
+FRAME_OK = "ok"
+FRAME_DUPLICATE = "duplicate"
+FRAME_TOO_DARK = "too_dark"
+FRAME_TOO_BLURRY = "too_blurry"
+
+# Detection result as produced by FaceRecognitionService.detect_regions
+DetectionResult = Tuple[bool, bool, float, List[tuple]]
+
+class FrameTriage:
+    """
+    Cheap pre-detection stage that runs before the cascades.
+    Keeps a tiny grayscale thumbnail of the last analysed frame per user so
+    near-duplicate frames can reuse the previous detection result, and rejects
+    frames that are too dark or too blurry to be worth detecting on.
+    """
+
+    def __init__(
+        self,
+        thumbnail_size: int = settings.FRAME_TRIAGE_THUMBNAIL_SIZE,
+        diff_threshold: float = settings.FRAME_TRIAGE_DIFF_THRESHOLD,
+        min_brightness: float = settings.FRAME_TRIAGE_MIN_BRIGHTNESS,
+        min_sharpness: float = settings.FRAME_TRIAGE_MIN_SHARPNESS,
+        max_reuse: int = settings.FRAME_TRIAGE_MAX_REUSE
+    ):
+        self.thumbnail_size = thumbnail_size
+        self.diff_threshold = diff_threshold
+        self.min_brightness = min_brightness
+        self.min_sharpness = min_sharpness
+        self.max_reuse = max_reuse
+        # user_id -> {"thumbnail", "result", "reuse_count"}
+        self._last: Dict[str, dict] = {}
+        self.stats = {
+            FRAME_OK: 0,
+            FRAME_DUPLICATE: 0,
+            FRAME_TOO_DARK: 0,
+            FRAME_TOO_BLURRY: 0
+        }
+
+    def _thumbnail(self, gray: np.ndarray) -> np.ndarray:
+        return cv2.resize(
+            gray,
+            (self.thumbnail_size, self.thumbnail_size),
+            interpolation=cv2.INTER_AREA
+        ).astype(np.int16)
+
+    def assess(self, user_id: str, frame: np.ndarray) -> Tuple[str, Optional[DetectionResult]]:
+        """
+        Classify a frame before detection
+        Returns: (verdict, cached_result) - cached_result is only set for duplicates
+        """
+        # Work on a small copy so the quality checks stay cheap on large frames
+        small = cv2.resize(frame, (160, 120), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        if gray.mean() < self.min_brightness:
+            self.stats[FRAME_TOO_DARK] += 1
+            return FRAME_TOO_DARK, None
+
+        if cv2.Laplacian(gray, cv2.CV_64F).var() < self.min_sharpness:
+            self.stats[FRAME_TOO_BLURRY] += 1
+            return FRAME_TOO_BLURRY, None
+
+        thumbnail = self._thumbnail(gray)
+        previous = self._last.get(user_id)
+
+        if previous is not None and previous["reuse_count"] < self.max_reuse:
+            diff = np.abs(thumbnail - previous["thumbnail"]).mean()
+            if diff < self.diff_threshold:
+                previous["reuse_count"] += 1
+                self.stats[FRAME_DUPLICATE] += 1
+                return FRAME_DUPLICATE, previous["result"]
+
+        # Stash the thumbnail; the result is filled in by remember()
+        self._last[user_id] = {"thumbnail": thumbnail, "result": None, "reuse_count": 0}
+        self.stats[FRAME_OK] += 1
+        return FRAME_OK, None
+
+    def remember(self, user_id: str, result: DetectionResult):
+        """Store the detection result for the frame last assessed as ok"""
+        entry = self._last.get(user_id)
+        if entry is not None:
+            entry["result"] = result
+
+    async def detect(
+        self,
+        user_id: str,
+        frame: np.ndarray,
+        detect_regions: Callable[[np.ndarray], Awaitable[DetectionResult]]
+    ) -> Tuple[Optional[DetectionResult], str]:
+        """
+        Run triage and, only if needed, the detector coroutine
+        Returns: ((face_detected, eyes_detected, confidence, regions), verdict)
+        A dark or blurry frame says nothing about the user, so it reuses the
+        last result (up to max_reuse times) or returns None for it - never
+        a "no face" result that would close an open window.
+        """
+        verdict, cached = self.assess(user_id, frame)
+
+        if verdict == FRAME_DUPLICATE and cached is not None:
+            return cached, verdict
+
+        if verdict in (FRAME_TOO_DARK, FRAME_TOO_BLURRY):
+            previous = self._last.get(user_id)
+            if previous is not None and previous["result"] is not None and previous["reuse_count"] < self.max_reuse:
+                previous["reuse_count"] += 1
+                return previous["result"], verdict
+            return None, verdict
+
+        result = await detect_regions(frame)
+        self.remember(user_id, result)
+        return result, verdict
+
+    def forget(self, user_id: str):
+        """Drop cached state for a user"""
+        self._last.pop(user_id, None)
+
+# Global instance
+frame_triage = FrameTriage()
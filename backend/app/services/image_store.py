@@ -0,0 +1,67 @@
+import cv2
+import hashlib
+import numpy as np
+import os
+from typing import Dict
+from app.core.storage import atomic_write
+
+# variant -> (max side in px, JPEG quality); None keeps the original bytes
+IMAGE_VARIANTS = {
+    "thumb": (96, 80),
+    "medium": (320, 85),
+    "original": None,
+}
+
+class ImageStore:
+    """
+    Content-addressed image store. Files are named after the SHA-256 of the
+    uploaded bytes, so identical uploads share storage and a URL never
+    changes content - which lets them be cached forever.
+    """
+
+    def __init__(self, root: str = "uploads/images"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, digest: str, variant: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}_{variant}.jpg")
+
+    def _resize(self, image: np.ndarray, max_side: int) -> np.ndarray:
+        h, w = image.shape[:2]
+        scale = max_side / max(h, w)
+        if scale >= 1:
+            return image
+        return cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    def put(self, image_bytes: bytes, image: np.ndarray) -> Dict[str, str]:
+        """
+        Store an image and its size variants
+        Returns variant -> path (relative, servable under /uploads/images)
+        """
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        paths = {}
+
+        for variant, spec in IMAGE_VARIANTS.items():
+            path = self._path(digest, variant)
+            paths[variant] = path.replace(os.sep, "/")
+            if os.path.exists(path):
+                continue  # same content already stored
+
+            if spec is None:
+                data = image_bytes
+            else:
+                max_side, quality = spec
+                ok, buffer = cv2.imencode(
+                    ".jpg",
+                    self._resize(image, max_side),
+                    [cv2.IMWRITE_JPEG_QUALITY, quality]
+                )
+                if not ok:
+                    continue
+                data = buffer.tobytes()
+            atomic_write(path, data)
+
+        return paths
+
+# Global instance
+image_store = ImageStore()
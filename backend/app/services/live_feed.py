@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Dict, Optional, Set
+import asyncio
+from app.core.config import settings
+
+class Subscriber:
+    """One connected live feed client with a bounded event queue"""
+
+    def __init__(self, manager_id: str, queue_size: int):
+        self.manager_id = manager_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        """Queue an event, dropping the oldest one if the client is behind"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+class LiveFeed:
+    """
+    In-process fan-out of monitoring state transitions to managers.
+    Events are routed by the employee's manager_id, so publishing costs
+    nothing when that manager has no open feed and never touches the
+    database.
+    """
+
+    def __init__(self, queue_size: int = settings.LIVE_FEED_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self.published = 0
+
+    def subscribe(self, manager_id: str) -> Subscriber:
+        subscriber = Subscriber(manager_id, self.queue_size)
+        self._subscribers.setdefault(manager_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.manager_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.manager_id]
+
+    @property
+    def active(self) -> bool:
+        """Whether any manager has an open feed"""
+        return bool(self._subscribers)
+
+    def has_subscribers(self, manager_id: Optional[str]) -> bool:
+        return manager_id is not None and manager_id in self._subscribers
+
+    def publish(self, manager_id: Optional[str], event_type: str, user_id: str, **data):
+        """Send an event about an employee to their manager's subscribers"""
+        if not self.has_subscribers(manager_id):
+            return
+        event = {
+            "type": event_type,
+            "user_id": user_id,
+            "timestamp": datetime.utcnow(),
+            **data
+        }
+        for subscriber in self._subscribers[manager_id]:
+            subscriber.offer(event)
+        self.published += 1
+
+    def stats(self) -> dict:
+        subscribers = [s for group in self._subscribers.values() for s in group]
+        return {
+            "managers": len(self._subscribers),
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in subscribers)
+        }
+
+# Global instance
+live_feed = LiveFeed()
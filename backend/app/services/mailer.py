@@ -0,0 +1,111 @@
+from email.message import EmailMessage
+from typing import List, Optional
+import asyncio
+import time
+import aiosmtplib
+from app.core.config import settings
+
+class SMTPPool:
+    """
+    A few long-lived SMTP connections shared by all senders. Connections
+    are opened on first use, reused for every message (one handshake and
+    login per connection, not per email), reopened if the server dropped
+    them and closed after sitting idle.
+    """
+
+    def __init__(
+        self,
+        size: int = settings.SMTP_POOL_SIZE,
+        idle_seconds: float = settings.SMTP_IDLE_SECONDS
+    ):
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self._idle: Optional[asyncio.Queue] = None
+        self.sent = 0
+        self.connects = 0
+        self.failed = 0
+
+    def _client(self) -> aiosmtplib.SMTP:
+        return aiosmtplib.SMTP(
+            hostname=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USERNAME or None,
+            password=settings.SMTP_PASSWORD or None,
+            use_tls=settings.SMTP_PORT == 465,
+            timeout=settings.SMTP_TIMEOUT_SECONDS
+        )
+
+    def _slots(self) -> asyncio.Queue:
+        # Created lazily so the queue binds to the running event loop
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait((None, 0.0))
+        return self._idle
+
+    async def _ready(self, client: Optional[aiosmtplib.SMTP], last_used: float) -> aiosmtplib.SMTP:
+        if client is not None and client.is_connected and time.monotonic() - last_used < self.idle_seconds:
+            return client
+        if client is not None:
+            client.close()
+        client = self._client()
+        await client.connect()
+        self.connects += 1
+        return client
+
+    async def send(self, message: EmailMessage):
+        """Send one message on a pooled connection, retrying once on a fresh one"""
+        slots = self._slots()
+        client, last_used = await slots.get()
+        try:
+            for attempt in range(2):
+                try:
+                    client = await self._ready(client, last_used)
+                    await client.send_message(message)
+                    self.sent += 1
+                    return
+                except aiosmtplib.SMTPServerDisconnected:
+                    # The server timed the connection out; a fresh one usually works
+                    client, last_used = None, 0.0
+                    if attempt:
+                        raise
+        except Exception:
+            self.failed += 1
+            if client is not None:
+                client.close()
+            client = None
+            raise
+        finally:
+            slots.put_nowait((client, time.monotonic()))
+
+    async def close(self):
+        """Quit every open connection"""
+        if self._idle is None:
+            return
+        clients = []
+        while not self._idle.empty():
+            clients.append(self._idle.get_nowait())
+        for client, _ in clients:
+            if client is not None and client.is_connected:
+                try:
+                    await client.quit()
+                except aiosmtplib.SMTPException:
+                    client.close()
+        for _ in clients:
+            self._idle.put_nowait((None, 0.0))
+
+    def stats(self) -> dict:
+        return {"size": self.size, "sent": self.sent, "connects": self.connects, "failed": self.failed}
+
+def build_message(to: List[str], subject: str, text: str, html: Optional[str] = None) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.FROM_EMAIL
+    message["To"] = ", ".join(to)
+    message["Subject"] = subject
+    message.set_content(text)
+    if html:
+        message.add_alternative(html, subtype="html")
+    return message
+
+# Global instance
+smtp_pool = SMTPPool()
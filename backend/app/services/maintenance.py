@@ -0,0 +1,307 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+import asyncio
+import os
+import time
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.database import ensure_indexes, get_analytics_collection, get_collection
+
+# Where face_service and image_store keep their files (relative to backend/)
+FACES_DIR = "uploads/faces"
+IMAGES_DIR = "uploads/images"
+TEMP_DIR = "uploads/temp"
+
+VALID_ROLES = ["admin", "manager", "employee"]
+
+class MaintenanceService:
+    """
+    Batched database and upload housekeeping that is safe to run against
+    a live deployment. Every task walks its data in _id (or file name)
+    order in batches of batch_size, sleeps at least as long as each batch
+    took so it never holds more than half of a connection's time, and
+    saves a checkpoint after each batch so an interrupted run resumes
+    where it stopped.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.MAINTENANCE_BATCH_SIZE,
+        pause_seconds: float = settings.MAINTENANCE_BATCH_PAUSE_MS / 1000,
+        file_grace_seconds: int = settings.MAINTENANCE_FILE_GRACE_SECONDS
+    ):
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.file_grace_seconds = file_grace_seconds
+
+    def checkpoints(self):
+        return get_collection("maintenance_checkpoints")
+
+    async def _load_checkpoint(self, task: str, restart: bool) -> dict:
+        if restart:
+            await self.checkpoints().delete_one({"_id": task})
+            return {}
+        return await self.checkpoints().find_one({"_id": task}) or {}
+
+    async def _save_checkpoint(self, task: str, position, stats: dict):
+        await self.checkpoints().update_one(
+            {"_id": task},
+            {"$set": {"position": position, "stats": stats, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def _finish(self, task: str, dry_run: bool):
+        # A dry run must not discard the checkpoint of an interrupted real run
+        if not dry_run:
+            await self.checkpoints().delete_one({"_id": task})
+
+    async def _pace(self, started: float):
+        await asyncio.sleep(max(self.pause_seconds, time.perf_counter() - started))
+
+    async def _existing_user_ids(self, user_ids: Set[str]) -> Set[str]:
+        ids = [ObjectId(user_id) for user_id in user_ids if ObjectId.is_valid(user_id)]
+        if not ids:
+            return set()
+        cursor = get_collection("users").find({"_id": {"$in": ids}}, {"_id": 1})
+        return {str(user["_id"]) async for user in cursor}
+
+    async def _scan(self, collection, query: dict, projection: dict, last_id=None):
+        """
+        Yield batches of documents after last_id in _id order
+        Callers save the checkpoint once a batch is handled
+        """
+        while True:
+            batch_query = dict(query)
+            if last_id is not None:
+                batch_query["_id"] = {"$gt": last_id}
+            batch = await collection.find(batch_query, projection).sort("_id", 1).limit(self.batch_size).to_list(None)
+            if not batch:
+                return
+            last_id = batch[-1]["_id"]
+            yield batch, last_id
+
+    async def purge_orphaned_sessions(self, dry_run: bool = False, restart: bool = False) -> dict:
+        """Delete completed work sessions whose user no longer exists"""
+        task = "orphaned_sessions"
+        stats = {"scanned": 0, "orphaned": 0}
+        sessions_collection = get_collection("work_sessions")
+        checkpoint = await self._load_checkpoint(task, restart)
+        async for batch, last_id in self._scan(
+            sessions_collection, {"status": "completed"}, {"user_id": 1}, checkpoint.get("position")
+        ):
+            started = time.perf_counter()
+            existing = await self._existing_user_ids({session["user_id"] for session in batch})
+            orphaned = [session["_id"] for session in batch if session["user_id"] not in existing]
+            if orphaned and not dry_run:
+                await sessions_collection.delete_many({"_id": {"$in": orphaned}, "status": "completed"})
+            stats["scanned"] += len(batch)
+            stats["orphaned"] += len(orphaned)
+            if not dry_run:
+                await self._save_checkpoint(task, last_id, stats)
+            await self._pace(started)
+
+        await self._finish(task, dry_run)
+        return stats
+
+    def _stale_files(self, directory: str) -> List[str]:
+        """Files in a directory older than the grace period, sorted by name"""
+        if not os.path.isdir(directory):
+            return []
+        cutoff = time.time() - self.file_grace_seconds
+        return sorted(
+            entry.name for entry in os.scandir(directory)
+            if entry.is_file() and entry.stat().st_mtime < cutoff
+        )
+
+    async def purge_orphaned_faces(self, dry_run: bool = False, restart: bool = False) -> dict:
+        """
+        Delete face encodings (<user_id>.npy) and legacy face images
+        (<user_id>.jpg) of users that no longer exist, plus abandoned
+        temporary uploads
+        """
+        task = "orphaned_faces"
+        stats = {"scanned": 0, "orphaned": 0, "temp": 0}
+        checkpoint = await self._load_checkpoint(task, restart)
+        names = [name for name in self._stale_files(FACES_DIR) if name > checkpoint.get("position", "")]
+
+        for start in range(0, len(names), self.batch_size):
+            started = time.perf_counter()
+            batch = names[start:start + self.batch_size]
+            owners = {name: os.path.splitext(name)[0] for name in batch}
+            existing = await self._existing_user_ids(set(owners.values()))
+            orphaned = [name for name, owner in owners.items() if owner not in existing]
+            stats["scanned"] += len(batch)
+            stats["orphaned"] += len(orphaned)
+            if not dry_run:
+                for name in orphaned:
+                    os.remove(os.path.join(FACES_DIR, name))
+                await self._save_checkpoint(task, batch[-1], stats)
+            await self._pace(started)
+
+        # Left behind by uploads that failed half-way in older versions
+        temp_files = self._stale_files(TEMP_DIR)
+        if not dry_run:
+            for name in temp_files:
+                os.remove(os.path.join(TEMP_DIR, name))
+        stats["temp"] = len(temp_files)
+
+        await self._finish(task, dry_run)
+        return stats
+
+    async def purge_unreferenced_images(self, dry_run: bool = False, restart: bool = False) -> dict:
+        """
+        Delete content-addressed face images no user references. Images
+        are shared between identical uploads, so the full reference set is
+        read first; files newer than the grace period are kept because an
+        enrollment writes its image before updating the user.
+        """
+        task = "unreferenced_images"
+        stats = {"scanned": 0, "unreferenced": 0}
+        referenced: Set[str] = set()
+        users_collection = get_analytics_collection("users")
+        async for batch, _ in self._scan(
+            users_collection,
+            {"$or": [{"face_image": {"$exists": True}}, {"face_images": {"$exists": True}}]},
+            {"face_image": 1, "face_images": 1}
+        ):
+            started = time.perf_counter()
+            for user in batch:
+                referenced.update((user.get("face_images") or {}).values())
+                if user.get("face_image"):
+                    referenced.add(user["face_image"])
+            await self._pace(started)
+
+        checkpoint = await self._load_checkpoint(task, restart)
+        prefixes = sorted(os.listdir(IMAGES_DIR)) if os.path.isdir(IMAGES_DIR) else []
+        for prefix in prefixes:
+            if prefix <= checkpoint.get("position", ""):
+                continue
+            directory = os.path.join(IMAGES_DIR, prefix)
+            names = self._stale_files(directory)
+            for start in range(0, len(names), self.batch_size):
+                started = time.perf_counter()
+                batch = names[start:start + self.batch_size]
+                unreferenced = [name for name in batch if f"{IMAGES_DIR}/{prefix}/{name}" not in referenced]
+                if not dry_run:
+                    for name in unreferenced:
+                        os.remove(os.path.join(directory, name))
+                stats["scanned"] += len(batch)
+                stats["unreferenced"] += len(unreferenced)
+                await self._pace(started)
+            if not dry_run:
+                await self._save_checkpoint(task, prefix, stats)
+
+        await self._finish(task, dry_run)
+        return stats
+
+    async def recompute_active_time(self, dry_run: bool = False, restart: bool = False) -> dict:
+        """
+        Set total_active_time of completed sessions to the sum of their
+        completed eye detection windows. The sums are computed by the
+        server, so detection logs never cross the network. Compacted
+        sessions have no logs and are skipped.
+        """
+        task = "active_time"
+        stats = {"scanned": 0, "corrected": 0, "seconds_added": 0}
+        sessions_collection = get_collection("work_sessions")
+        checkpoint = await self._load_checkpoint(task, restart)
+        last_id = checkpoint.get("position")
+
+        while True:
+            started = time.perf_counter()
+            match = {"status": "completed", "compacted_at": {"$exists": False}}
+            if last_id is not None:
+                match["_id"] = {"$gt": last_id}
+            batch = await sessions_collection.aggregate([
+                {"$match": match},
+                {"$sort": {"_id": 1}},
+                {"$limit": self.batch_size},
+                {"$project": {
+                    "total_active_time": 1,
+                    "computed": {"$sum": {"$map": {
+                        "input": {"$filter": {
+                            "input": {"$ifNull": ["$eye_detection_logs", []]},
+                            "cond": "$$this.eyes_detected"
+                        }},
+                        "in": "$$this.duration"
+                    }}}
+                }}
+            ]).to_list(None)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+
+            operations = [
+                # Conditional on the old value so a concurrent write is never overwritten
+                UpdateOne(
+                    {"_id": session["_id"], "total_active_time": session.get("total_active_time")},
+                    {"$set": {"total_active_time": int(session["computed"])}}
+                )
+                for session in batch
+                if session.get("total_active_time") != session["computed"]
+            ]
+            if operations and not dry_run:
+                await sessions_collection.bulk_write(operations, ordered=False)
+            stats["scanned"] += len(batch)
+            stats["corrected"] += len(operations)
+            stats["seconds_added"] += sum(
+                int(session["computed"]) - (session.get("total_active_time") or 0)
+                for session in batch
+                if session.get("total_active_time") != session["computed"]
+            )
+            if not dry_run:
+                await self._save_checkpoint(task, last_id, stats)
+            await self._pace(started)
+
+        await self._finish(task, dry_run)
+        return stats
+
+    async def purge_invalid_users(self, dry_run: bool = False, restart: bool = False) -> dict:
+        """Delete users with an unknown role or missing username/full_name"""
+        task = "invalid_users"
+        stats = {"scanned": 0, "deleted": 0}
+        users_collection = get_collection("users")
+        invalid = {"$or": [
+            {"role": {"$nin": VALID_ROLES}},
+            {"username": {"$exists": False}},
+            {"full_name": {"$exists": False}}
+        ]}
+        checkpoint = await self._load_checkpoint(task, restart)
+        async for batch, last_id in self._scan(users_collection, invalid, {"_id": 1}, checkpoint.get("position")):
+            started = time.perf_counter()
+            stats["scanned"] += len(batch)
+            if not dry_run:
+                result = await users_collection.delete_many({"_id": {"$in": [user["_id"] for user in batch]}, **invalid})
+                stats["deleted"] += result.deleted_count
+                await self._save_checkpoint(task, last_id, stats)
+            await self._pace(started)
+
+        await self._finish(task, dry_run)
+        return stats
+
+    async def rebuild_indexes(self, drop: Optional[List[str]] = None, dry_run: bool = False) -> Dict[str, List[dict]]:
+        """
+        Create any missing indexes (online builds) and report every index
+        with its usage since the server started, so unused ones can be
+        dropped by name ("collection.index")
+        """
+        if not dry_run:
+            await ensure_indexes()
+        for qualified in [] if dry_run else drop or []:
+            collection, _, name = qualified.partition(".")
+            if name == "_id_":
+                raise ValueError("The _id index cannot be dropped")
+            await get_collection(collection).drop_index(name)
+
+        report = {}
+        for collection in ("users", "work_sessions"):
+            usage = await get_collection(collection).aggregate([{"$indexStats": {}}]).to_list(None)
+            report[collection] = [
+                {"name": index["name"], "key": dict(index["key"]), "ops": index["accesses"]["ops"]}
+                for index in sorted(usage, key=lambda index: index["name"])
+            ]
+        return report
+
+# Global instance
+maintenance_service = MaintenanceService()
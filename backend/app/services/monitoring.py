@@ -1,35 +1,128 @@
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
+import asyncio
+import os
+import socket
+import time
+import uuid
+import numpy as np
+from pymongo import UpdateOne
+from app.core.config import settings
 from app.core.database import get_collection
-from app.services.face_recognition import face_service
+from app.services.live_feed import live_feed
+from app.services.session_store import SessionStore
 from bson import ObjectId
 
+def new_session_document(user: dict, owner: Optional[str] = None) -> dict:
+    """
+    Build a new active work session document for a user
+    owner is the MonitoringService.owner of the process that monitors it
+    """
+    now = datetime.utcnow()
+    return {
+        "user_id": str(user["_id"]),
+        "user_name": user["full_name"],
+        "start_time": now,
+        "end_time": None,
+        "status": "active",
+        "total_active_time": 0,
+        "eye_detection_logs": [],
+        "shift_start": user.get("shift_start"),
+        "shift_end": user.get("shift_end"),
+        "created_at": now,
+        "updated_at": now,
+        "owner": owner
+    }
+
+class ManualClock:
+    """Clock for replays: returns `now` (epoch seconds) until it is moved"""
+    
+    def __init__(self, now: float = 0.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
 class MonitoringService:
-    def __init__(self):
-        # Store active monitoring sessions in memory
-        self.active_sessions: Dict[str, dict] = {}
-        # Track eye detection windows
-        self.eye_detection_windows: Dict[str, list] = {}
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.time,
+        sessions_collection=None
+    ):
+        # Epoch-seconds time source and work_sessions write sink; both can
+        # be injected so recorded detections can be replayed offline
+        self.clock = clock
+        self._sessions_collection = sessions_collection
+        # Identifies this process in session documents and its heartbeat
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Store active monitoring sessions in memory (one slot per user)
+        self.sessions = SessionStore()
         self.eye_detection_threshold = 5 * 60  # 5 minutes in seconds
+        self.max_detection_gap = 10  # seconds allowed between eye detections
+        self.min_partial_window = 60  # only log incomplete windows longer than this
+        self.idle_timeout = settings.SESSION_IDLE_TIMEOUT_SECONDS
+        self.reaper_interval = settings.SESSION_REAPER_INTERVAL_SECONDS
+        # user_id -> manager_id of monitored users, for routing live feed events
+        self.manager_ids: Dict[str, Optional[str]] = {}
+        # Called with the user_id whenever monitoring stops (e.g. to drop
+        # per-user vision caches); registered by the vision routes so this
+        # module never imports OpenCV
+        self.stop_hooks: List[Callable[[str], None]] = []
     
-    async def start_monitoring(self, user_id: str, session_id: str):
-        """Start monitoring for a user"""
-        self.active_sessions[user_id] = {
-            "session_id": session_id,
-            "start_time": datetime.utcnow(),
-            "last_activity": datetime.utcnow(),
-            "active_seconds": 0,
-            "eye_detection_start": None,
-            "consecutive_eye_detection": 0
-        }
-        self.eye_detection_windows[user_id] = []
+    def _utcnow(self) -> datetime:
+        return datetime.utcfromtimestamp(self.clock())
+    
+    def sessions_collection(self):
+        """Where session writes go: work_sessions unless a sink was injected"""
+        if self._sessions_collection is not None:
+            return self._sessions_collection
+        return get_collection("work_sessions")
+    
+    def _publish(self, slots: np.ndarray, event_type: str, **data):
+        """Publish one live feed event per slot; array values are per slot"""
+        if not live_feed.active:
+            return
+        for i, slot in enumerate(slots):
+            user_id = self.sessions.user_id(slot)
+            live_feed.publish(
+                self.manager_ids.get(user_id),
+                event_type,
+                user_id,
+                **{key: int(value[i]) if isinstance(value, np.ndarray) else value for key, value in data.items()}
+            )
+    
+    async def start_monitoring(
+        self,
+        user_id: str,
+        session_id: str,
+        track_idle: bool = True,
+        manager_id: Optional[str] = None
+    ):
+        """
+        Start monitoring for a user
+        With track_idle=False the session is not reaped for inactivity
+        until its first frame arrives (used for shift auto-start)
+        """
+        self.sessions.add(user_id, session_id, self.clock(), track_idle=track_idle)
+        self.manager_ids[user_id] = manager_id
+        live_feed.publish(manager_id, "session_started", user_id, session_id=session_id)
     
     def stop_monitoring(self, user_id: str):
         """Stop monitoring for a user"""
-        if user_id in self.active_sessions:
-            del self.active_sessions[user_id]
-        if user_id in self.eye_detection_windows:
-            del self.eye_detection_windows[user_id]
+        slot = self.sessions.slot(user_id)
+        if slot is not None:
+            live_feed.publish(
+                self.manager_ids.get(user_id),
+                "session_ended",
+                user_id,
+                session_id=self.sessions.session_id(slot),
+                active_time=int(self.sessions.active_seconds[slot])
+            )
+        # Hooks run while the session state is still readable
+        for hook in self.stop_hooks:
+            hook(user_id)
+        self.sessions.remove(user_id)
+        self.manager_ids.pop(user_id, None)
     
     async def process_detection(
         self, 
@@ -41,94 +134,271 @@ class MonitoringService:
         Process face and eye detection
         Returns updated monitoring status
         """
-        if user_id not in self.active_sessions:
+        store = self.sessions
+        slot = store.slot(user_id)
+        if slot is None:
             return {"error": "No active session"}
         
-        session = self.active_sessions[user_id]
-        current_time = datetime.utcnow()
-        
-        # Update based on eye detection
-        if eyes_detected:
-            if session["eye_detection_start"] is None:
-                session["eye_detection_start"] = current_time
-                session["consecutive_eye_detection"] = 1
-            else:
-                # Calculate time since last detection
-                time_diff = (current_time - session["last_activity"]).total_seconds()
-                if time_diff <= 10:  # Allow 10 second gap
-                    session["consecutive_eye_detection"] += time_diff
-                else:
-                    # Reset if gap too long
-                    session["eye_detection_start"] = current_time
-                    session["consecutive_eye_detection"] = 1
-            
-            session["last_activity"] = current_time
-            
-            # If we've reached 5 minutes of eye detection, add to active time
-            if session["consecutive_eye_detection"] >= self.eye_detection_threshold:
-                session["active_seconds"] += self.eye_detection_threshold
-                # Reset the window
-                session["eye_detection_start"] = current_time
-                session["consecutive_eye_detection"] = 0
-                
-                # Log this detection window
-                await self._log_eye_detection(user_id, session["session_id"], True, self.eye_detection_threshold)
-        else:
-            # Eyes not detected, reset counter
-            if session["eye_detection_start"] is not None:
-                # Log incomplete detection
-                partial_time = (current_time - session["eye_detection_start"]).total_seconds()
-                if partial_time > 60:  # Only log if more than 1 minute
-                    await self._log_eye_detection(user_id, session["session_id"], False, int(partial_time))
-            
-            session["eye_detection_start"] = None
-            session["consecutive_eye_detection"] = 0
+        await self.process_detections(np.array([slot]), np.array([eyes_detected]))
         
         return {
             "is_monitoring": True,
-            "active_time": session["active_seconds"],
-            "current_window_time": session["consecutive_eye_detection"],
+            "active_time": int(store.active_seconds[slot]),
+            "current_window_time": float(store.window_time[slot]),
             "eyes_detected": eyes_detected,
             "face_detected": face_detected,
-            "last_activity": session["last_activity"]
+            "last_activity": datetime.utcfromtimestamp(store.last_activity[slot])
         }
     
-    async def _log_eye_detection(
-        self, 
-        user_id: str, 
-        session_id: str, 
-        completed: bool, 
-        duration: int
-    ):
-        """Log eye detection window to database"""
-        sessions_collection = get_collection("work_sessions")
+    async def process_detections(
+        self,
+        slots: np.ndarray,
+        eyes_detected: np.ndarray,
+        now=None
+    ) -> int:
+        """
+        Apply one detection to each of several sessions at once
+        slots must be unique; now is one timestamp or one per slot
+        (defaults to the clock). All resulting log entries go out in a
+        single bulk write.
+        Returns number of log entries written
+        """
+        store = self.sessions
+        eyes = np.asarray(eyes_detected, dtype=bool)
+        now = np.broadcast_to(np.asarray(self.clock() if now is None else now, dtype=np.float64), slots.shape)
+        store.touch(slots, now)
+        # A window whose last detection is too old ends there, exactly as
+        # tick() would have closed it, before this frame is applied
+        stale_operations = self._close_stale_windows(now, slots)
+        window_open = ~np.isnan(store.window_start[slots])
         
-        log_entry = {
-            "timestamp": datetime.utcnow(),
-            "eyes_detected": completed,
-            "duration": duration
-        }
+        # Eyes not detected: close open windows, logging the long ones
+        lost = ~eyes & window_open
+        lost_slots, lost_at = slots[lost], now[lost]
+        partial_time = lost_at - store.window_start[lost_slots]
+        self._publish(lost_slots, "eyes_lost")
+        store.window_start[slots[~eyes]] = np.nan
+        store.window_time[slots[~eyes]] = 0
+        
+        # Eyes detected with no open window: start one
+        opened = eyes & ~window_open
+        store.window_start[slots[opened]] = now[opened]
+        store.window_time[slots[opened]] = 1
+        self._publish(slots[opened], "eyes_detected")
+        
+        # Eyes detected in an open (so recent) window: extend it
+        extended_slots, extended_at = slots[eyes & window_open], now[eyes & window_open]
+        store.window_time[extended_slots] += extended_at - store.last_activity[extended_slots]
         
-        await sessions_collection.update_one(
-            {"_id": ObjectId(session_id)},
+        seen_slots, seen_at = slots[eyes], now[eyes]
+        store.last_activity[seen_slots] = seen_at
+        
+        # Windows that reached 5 minutes of eye detection add to active time
+        completed = store.window_time[seen_slots] >= self.eye_detection_threshold
+        completed_slots, completed_at = seen_slots[completed], seen_at[completed]
+        store.active_seconds[completed_slots] += self.eye_detection_threshold
+        store.window_start[completed_slots] = completed_at
+        store.window_time[completed_slots] = 0
+        self._publish(completed_slots, "window_completed", active_time=store.active_seconds[completed_slots])
+        
+        logged = partial_time > self.min_partial_window
+        operations = stale_operations + [
+            self._log_operation(slot, True, self.eye_detection_threshold, at)
+            for slot, at in zip(completed_slots, completed_at)
+        ] + [
+            self._log_operation(slot, False, int(duration), at)
+            for slot, duration, at in zip(lost_slots[logged], partial_time[logged], lost_at[logged])
+        ]
+        if operations:
+            await self.sessions_collection().bulk_write(operations, ordered=False)
+        return len(operations)
+    
+    def _close_stale_windows(self, now, slots: Optional[np.ndarray] = None) -> List[UpdateOne]:
+        """
+        Close windows whose last detection is more than max_detection_gap
+        old, returning log entries for the ones longer than
+        min_partial_window. Entries are stamped with the window's last
+        detection, so the log is the same whether the reaper or the
+        session's next frame closes the window.
+        """
+        store = self.sessions
+        checked = store.active_slots() if slots is None else slots
+        now = np.broadcast_to(np.asarray(now, dtype=np.float64), checked.shape)
+        slots, durations = store.expire_windows(now, self.max_detection_gap, checked)
+        # expire_windows keeps the order of `checked`
+        closed_at = now[np.isin(checked, slots)]
+        self._publish(slots, "eyes_lost", reason="stale")
+        return [
+            self._log_operation(slot, False, int(duration), store.last_activity[slot], at)
+            for slot, duration, at in zip(slots, durations, closed_at)
+            if duration > self.min_partial_window
+        ]
+    
+    async def tick(self) -> int:
+        """
+        Advance all sessions at once: close eye detection windows that have
+        gone stale and log the partial ones in a single bulk write
+        Returns number of log entries written
+        """
+        operations = self._close_stale_windows(self.clock())
+        if operations:
+            await self.sessions_collection().bulk_write(operations, ordered=False)
+        return len(operations)
+    
+    async def end_sessions(self, user_ids: List[str], at_last_seen: bool = False) -> int:
+        """
+        Complete the monitored sessions of several users with one bulk write
+        and free their in-memory state. With at_last_seen the end time is
+        the user's last frame instead of now.
+        Returns number of sessions ended
+        """
+        store = self.sessions
+        now = self._utcnow()
+        operations = []
+        ended = []
+        for user_id in user_ids:
+            slot = store.slot(user_id)
+            if slot is None:
+                continue
+            end_time = datetime.utcfromtimestamp(store.last_seen[slot]) if at_last_seen else now
+            operations.append(UpdateOne(
+                {"_id": ObjectId(store.session_id(slot)), "status": {"$ne": "completed"}},
+                {"$set": {
+                    "end_time": end_time,
+                    "status": "completed",
+                    "total_active_time": int(store.active_seconds[slot]),
+                    "updated_at": now
+                }}
+            ))
+            ended.append(user_id)
+        
+        # Free memory before awaiting so frames arriving meanwhile see no session
+        for user_id in ended:
+            self.stop_monitoring(user_id)
+        
+        if operations:
+            await self.sessions_collection().bulk_write(operations, ordered=False)
+        
+        return len(ended)
+    
+    async def reap_idle_sessions(self) -> int:
+        """
+        Finalize sessions that stopped sending frames (e.g. the tab was closed
+        without ending the session) and free their in-memory state
+        Returns number of sessions reaped
+        """
+        idle_users = self.sessions.idle_users(self.clock() - self.idle_timeout)
+        if not idle_users:
+            return 0
+        
+        reaped = await self.end_sessions(idle_users, at_last_seen=True)
+        print(f"🧹 Reaped {reaped} idle monitoring sessions")
+        return reaped
+    
+    async def heartbeat(self):
+        """
+        Mark this process as alive with one small write, however many
+        sessions it monitors; its sessions carry its owner id
+        """
+        await get_collection("monitor_heartbeats").update_one(
+            {"_id": self.owner},
+            {"$set": {"at": self._utcnow()}},
+            upsert=True
+        )
+    
+    async def finalize_orphaned_sessions(self) -> int:
+        """
+        Complete sessions left active in the database by a process that is
+        gone. Their in-memory monitoring state is lost, so they can never be
+        ended normally and would block the user's next session. Sessions
+        whose owner has heartbeated within the idle timeout belong to a
+        live sibling worker and are left alone; documents from before
+        owners fall back to updated_at alone.
+        """
+        now = self._utcnow()
+        cutoff = now - timedelta(seconds=self.idle_timeout)
+        live_owners = [self.owner] + [
+            heartbeat["_id"]
+            async for heartbeat in get_collection("monitor_heartbeats").find({"at": {"$gte": cutoff}}, {"_id": 1})
+        ]
+        result = await self.sessions_collection().update_many(
             {
-                "$push": {"eye_detection_logs": log_entry},
-                "$set": {"total_active_time": self.active_sessions[user_id]["active_seconds"]}
+                "status": {"$in": ["active", "paused"]},
+                "owner": {"$nin": live_owners},
+                # Also covers a new worker's sessions before its first heartbeat
+                "updated_at": {"$lt": cutoff}
+            },
+            {"$set": {"end_time": now, "status": "completed", "updated_at": now}}
+        )
+        if result.modified_count:
+            print(f"🧹 Finalized {result.modified_count} orphaned sessions")
+        return result.modified_count
+    
+    async def run_reaper(self):
+        """Background loop: advance windows, reap idle sessions and heartbeat"""
+        await self.heartbeat()
+        await self.finalize_orphaned_sessions()
+        while True:
+            await asyncio.sleep(self.reaper_interval)
+            try:
+                await self.tick()
+                await self.reap_idle_sessions()
+                await self.heartbeat()
+            except Exception as e:
+                print(f"Error in session reaper: {e}")
+    
+    def _log_operation(
+        self,
+        slot: int,
+        completed: bool,
+        duration: int,
+        at: float,
+        written_at: Optional[float] = None
+    ) -> UpdateOne:
+        """
+        Write that logs an eye detection window ending at `at` and saves
+        active time; updated_at is written_at (default: at)
+        """
+        timestamp = datetime.utcfromtimestamp(at)
+        return UpdateOne(
+            {"_id": ObjectId(self.sessions.session_id(slot))},
+            {
+                "$push": {"eye_detection_logs": {
+                    "timestamp": timestamp,
+                    "eyes_detected": completed,
+                    "duration": duration
+                }},
+                "$set": {
+                    "total_active_time": int(self.sessions.active_seconds[slot]),
+                    "updated_at": timestamp if written_at is None else datetime.utcfromtimestamp(written_at)
+                }
             }
         )
     
+    def mark_seen(self, user_id: str):
+        """Record a frame that could not be assessed: the session is not idle"""
+        slot = self.sessions.slot(user_id)
+        if slot is not None:
+            self.sessions.touch(np.array([slot]), self.clock())
+    
+    def in_window(self, user_id: str) -> bool:
+        """Whether the user has an open eye detection window"""
+        slot = self.sessions.slot(user_id)
+        return slot is not None and not np.isnan(self.sessions.window_start[slot])
+    
     def get_session_status(self, user_id: str) -> Optional[dict]:
         """Get current monitoring status for user"""
-        if user_id not in self.active_sessions:
+        store = self.sessions
+        slot = store.slot(user_id)
+        if slot is None:
             return None
         
-        session = self.active_sessions[user_id]
         return {
             "is_monitoring": True,
-            "session_id": session["session_id"],
-            "active_time": session["active_seconds"],
-            "current_window_time": session["consecutive_eye_detection"],
-            "last_activity": session["last_activity"]
+            "session_id": store.session_id(slot),
+            "active_time": int(store.active_seconds[slot]),
+            "current_window_time": float(store.window_time[slot]),
+            "last_activity": datetime.utcfromtimestamp(store.last_activity[slot])
         }
     
     async def get_shift_info(self, user_id: str) -> Optional[dict]:
@@ -142,20 +412,6 @@ class MonitoringService:
                 "shift_end": user["shift_end"]
             }
         return None
-    
-    def should_auto_start(self, shift_start: str) -> bool:
-        """Check if current time matches shift start"""
-        from datetime import datetime
-        current_time = datetime.now().strftime("%H:%M")
-        # Allow 15 minute window
-        return current_time >= shift_start and current_time <= self._add_minutes(shift_start, 15)
-    
-    def _add_minutes(self, time_str: str, minutes: int) -> str:
-        """Add minutes to time string"""
-        from datetime import datetime, timedelta
-        time_obj = datetime.strptime(time_str, "%H:%M")
-        new_time = time_obj + timedelta(minutes=minutes)
-        return new_time.strftime("%H:%M")
 
 # Global instance
 monitoring_service = MonitoringService()
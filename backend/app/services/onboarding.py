@@ -0,0 +1,205 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+import csv
+import io
+import json
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.core.database import get_collection
+from app.core.security import get_password_hashes
+from app.models.user import UserCreate
+from app.services.shift_scheduler import shift_scheduler
+
+def parse_rows(content: bytes, filename: str) -> List[dict]:
+    """
+    Parse a CSV (header row required) or JSON (array of objects) upload
+    Raises ValueError for unreadable or oversized input
+    """
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        rows = json.loads(text)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON upload must be an array of objects")
+    else:
+        rows = [
+            {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+
+    if len(rows) > settings.BULK_MAX_ROWS:
+        raise ValueError(f"At most {settings.BULK_MAX_ROWS} rows per upload")
+    return rows
+
+def summarize(results: List[dict]) -> dict:
+    """Per-status counts plus the per-row results"""
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {"total": len(results), **counts, "results": results}
+
+def _valid_time(value) -> bool:
+    try:
+        datetime.strptime(value, "%H:%M")
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def _error(row: int, key: Optional[str], detail: str) -> dict:
+    return {"row": row, "key": key, "status": "error", "detail": detail}
+
+def _validation_detail(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+async def bulk_create_users(rows: List[dict], creator: dict) -> List[dict]:
+    """
+    Create users from parsed rows with one duplicate lookup, parallel
+    hashing and one insert_many
+    Managers always create employees under themselves; admins may set
+    role and manager_id per row. Returns one result per row (1-based).
+    """
+    is_manager = creator["role"] == "manager"
+    results: Dict[int, dict] = {}
+    candidates = []  # (row number, validated user, extra fields)
+    seen_emails, seen_usernames = set(), set()
+
+    for number, row in enumerate(rows, start=1):
+        fields = dict(row)
+        if is_manager:
+            fields["role"] = "employee"
+        try:
+            user = UserCreate(**fields)
+        except ValidationError as e:
+            results[number] = _error(number, row.get("email"), _validation_detail(e))
+            continue
+
+        extra = {"manager_id": str(creator["_id"]) if is_manager else (row.get("manager_id") or None)}
+        if row.get("shift_start") or row.get("shift_end"):
+            if not (_valid_time(row.get("shift_start")) and _valid_time(row.get("shift_end"))):
+                results[number] = _error(number, user.email, "Invalid shift time. Use HH:MM (24-hour format)")
+                continue
+            extra["shift_start"] = row["shift_start"]
+            extra["shift_end"] = row["shift_end"]
+
+        if user.email in seen_emails or user.username in seen_usernames:
+            results[number] = _error(number, user.email, "Duplicate email or username in upload")
+            continue
+        seen_emails.add(user.email)
+        seen_usernames.add(user.username)
+        candidates.append((number, user, extra))
+
+    # One round trip for every existing email/username
+    users_collection = get_collection("users")
+    taken_emails, taken_usernames = set(), set()
+    if candidates:
+        cursor = users_collection.find(
+            {"$or": [
+                {"email": {"$in": list(seen_emails)}},
+                {"username": {"$in": list(seen_usernames)}}
+            ]},
+            {"email": 1, "username": 1}
+        )
+        async for existing in cursor:
+            taken_emails.add(existing.get("email"))
+            taken_usernames.add(existing.get("username"))
+
+    accepted = []
+    for number, user, extra in candidates:
+        if user.email in taken_emails:
+            results[number] = _error(number, user.email, "Email already registered")
+        elif user.username in taken_usernames:
+            results[number] = _error(number, user.email, "Username already taken")
+        else:
+            accepted.append((number, user, extra))
+
+    hashes = await get_password_hashes([user.password for _, user, _ in accepted])
+
+    now = datetime.utcnow()
+    documents = []
+    for (number, user, extra), password in zip(accepted, hashes):
+        document = user.dict()
+        document.update(extra)
+        document["role"] = user.role.value
+        document["password"] = password
+        document["is_active"] = True
+        document["created_at"] = now
+        document["updated_at"] = now
+        documents.append(document)
+
+    failed_indexes = {}
+    if documents:
+        try:
+            await users_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed_indexes = {err["index"]: err["errmsg"] for err in e.details.get("writeErrors", [])}
+
+    for index, ((number, user, _), document) in enumerate(zip(accepted, documents)):
+        if index in failed_indexes:
+            results[number] = _error(number, user.email, failed_indexes[index])
+            continue
+        if "shift_start" in document:
+            shift_scheduler.update_user(document)
+        results[number] = {"row": number, "key": user.email, "status": "created", "id": str(document["_id"])}
+
+    return [results[number] for number in sorted(results)]
+
+async def resolve_users(keys: List[str], creator: dict) -> Dict[str, dict]:
+    """
+    Look up users by id or email in one query
+    Returns key -> user for the keys the creator may manage
+    """
+    ids = [ObjectId(key) for key in keys if ObjectId.is_valid(key)]
+    emails = [key for key in keys if "@" in key]
+    if not ids and not emails:
+        return {}
+
+    users_collection = get_collection("users")
+    query = {"$or": [{"_id": {"$in": ids}}, {"email": {"$in": emails}}]}
+    if creator["role"] == "manager":
+        query["manager_id"] = str(creator["_id"])
+
+    users = {}
+    async for user in users_collection.find(query, {"password": 0}):
+        users[str(user["_id"])] = user
+        users[user.get("email")] = user
+    return {key: users[key] for key in keys if key in users}
+
+async def bulk_update_shifts(rows: List[dict], creator: dict) -> List[dict]:
+    """
+    Assign shifts from rows of (user_id or email, shift_start, shift_end)
+    with a single lookup and a single bulk_write
+    """
+    results: Dict[int, dict] = {}
+    valid = []
+    for number, row in enumerate(rows, start=1):
+        key = str(row.get("user_id") or row.get("email") or "").strip()
+        if not key:
+            results[number] = _error(number, None, "user_id or email is required")
+        elif not (_valid_time(row.get("shift_start")) and _valid_time(row.get("shift_end"))):
+            results[number] = _error(number, key, "Invalid time format. Use HH:MM (24-hour format)")
+        else:
+            valid.append((number, key, row["shift_start"], row["shift_end"]))
+
+    users = await resolve_users([key for _, key, _, _ in valid], creator)
+
+    now = datetime.utcnow()
+    operations, updated = [], []
+    for number, key, shift_start, shift_end in valid:
+        user = users.get(key)
+        if user is None:
+            results[number] = _error(number, key, "User not found")
+            continue
+        changes = {"shift_start": shift_start, "shift_end": shift_end, "updated_at": now}
+        operations.append(UpdateOne({"_id": user["_id"]}, {"$set": changes}))
+        user.update(changes)
+        updated.append(user)
+        results[number] = {"row": number, "key": key, "status": "updated", "id": str(user["_id"])}
+
+    if operations:
+        await get_collection("users").bulk_write(operations, ordered=False)
+        for user in updated:
+            shift_scheduler.update_user(user)
+
+    return [results[number] for number in sorted(results)]
@@ -0,0 +1,270 @@
+from datetime import date, datetime, timedelta
+from html import escape
+from typing import Optional, Tuple
+import asyncio
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.database import get_analytics_collection, get_collection
+from app.services.mailer import build_message, smtp_pool
+from app.services.shift_scheduler import next_occurrence
+
+PERIODS = ("daily", "weekly")
+# A claim older than this is assumed to belong to a crashed worker
+CLAIM_TIMEOUT = timedelta(hours=1)
+
+def report_range(period: str, day: date) -> Tuple[datetime, datetime]:
+    """
+    UTC [start, end) of the daily report for `day`, or of the weekly
+    report for the Monday-Sunday week containing it
+    """
+    start = datetime(day.year, day.month, day.day)
+    if period == "weekly":
+        start -= timedelta(days=start.weekday())
+        return start, start + timedelta(days=7)
+    return start, start + timedelta(days=1)
+
+def report_id(period: str, manager_id: str, start: datetime) -> str:
+    return f"{period}:{manager_id}:{start:%Y-%m-%d}"
+
+class ReportService:
+    """
+    Precomputes daily and weekly work-hours reports for every manager's
+    team during off-peak hours, so managers read a cached document instead
+    of scanning sessions at 9 am. Reports are cached in the reports
+    collection, keyed by period, manager and start date; each one is
+    claimed before it is built, so several workers running the scheduler
+    never build or email the same report twice.
+    """
+
+    def __init__(
+        self,
+        run_at: str = settings.REPORTS_RUN_AT,
+        weekly_day: int = settings.REPORTS_WEEKLY_DAY,
+        concurrency: int = settings.REPORTS_CONCURRENCY,
+        send_email: bool = settings.REPORTS_SEND_EMAIL
+    ):
+        self.run_at = run_at
+        self.weekly_day = weekly_day
+        self.concurrency = concurrency
+        self.send_email = send_email
+
+    def reports(self):
+        return get_collection("reports")
+
+    async def build(self, manager: dict, period: str, start: datetime, end: datetime) -> dict:
+        """Per-employee, per-day active hours of a manager's team, aggregated by the server"""
+        employees = await get_analytics_collection("users").find(
+            {"manager_id": str(manager["_id"]), "role": "employee"},
+            {"full_name": 1, "email": 1}
+        ).to_list(None)
+        user_ids = [str(employee["_id"]) for employee in employees]
+
+        totals = {}
+        if user_ids:
+            cursor = get_analytics_collection("work_sessions").aggregate([
+                {"$match": {"user_id": {"$in": user_ids}, "start_time": {"$gte": start, "$lt": end}}},
+                {"$group": {
+                    "_id": {
+                        "user_id": "$user_id",
+                        "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$start_time"}}
+                    },
+                    "seconds": {"$sum": "$total_active_time"},
+                    "sessions": {"$sum": 1}
+                }}
+            ])
+            async for row in cursor:
+                entry = totals.setdefault(row["_id"]["user_id"], {"days": {}, "seconds": 0, "sessions": 0})
+                entry["days"][row["_id"]["day"]] = round(row["seconds"] / 3600, 2)
+                entry["seconds"] += row["seconds"]
+                entry["sessions"] += row["sessions"]
+
+        rows = []
+        for employee in employees:
+            entry = totals.get(str(employee["_id"]), {"days": {}, "seconds": 0, "sessions": 0})
+            rows.append({
+                "user_id": str(employee["_id"]),
+                "user_name": employee.get("full_name", "Unknown"),
+                "total_hours": round(entry["seconds"] / 3600, 2),
+                "sessions": entry["sessions"],
+                "days": entry["days"]
+            })
+        rows.sort(key=lambda row: row["user_name"])
+
+        return {
+            "period": period,
+            "manager_id": str(manager["_id"]),
+            "manager_name": manager.get("full_name"),
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": (end - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "employees": rows,
+            "total_hours": round(sum(row["total_hours"] for row in rows), 2)
+        }
+
+    async def _claim(self, key: str) -> bool:
+        """Take ownership of building a report; False if done or owned elsewhere"""
+        now = datetime.utcnow()
+        try:
+            await self.reports().update_one(
+                {
+                    "_id": key,
+                    "status": {"$ne": "ready"},
+                    "$or": [{"claimed_at": {"$exists": False}}, {"claimed_at": {"$lt": now - CLAIM_TIMEOUT}}]
+                },
+                {"$set": {"status": "building", "claimed_at": now}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _message(self, report: dict, to: str):
+        title = f"{report['period'].capitalize()} work hours {report['start_date']}"
+        if report["end_date"] != report["start_date"]:
+            title += f" to {report['end_date']}"
+        lines = [f"{title} - {report['manager_name'] or 'team'}", ""]
+        lines += [f"{row['user_name']:<30} {row['total_hours']:>6.2f} h  ({row['sessions']} sessions)" for row in report["employees"]]
+        lines += ["", f"Team total: {report['total_hours']:.2f} h", f"{settings.FRONTEND_URL}"]
+        html_rows = "".join(
+            f"<tr><td>{escape(row['user_name'])}</td><td align='right'>{row['total_hours']:.2f}</td>"
+            f"<td align='right'>{row['sessions']}</td></tr>"
+            for row in report["employees"]
+        )
+        html = (
+            f"<h3>{escape(lines[0])}</h3><table cellpadding='4'>"
+            f"<tr><th align='left'>Employee</th><th>Hours</th><th>Sessions</th></tr>{html_rows}"
+            f"<tr><th align='left'>Team total</th><th align='right'>{report['total_hours']:.2f}</th><th></th></tr>"
+            f"</table><p><a href='{escape(settings.FRONTEND_URL)}'>Open dashboard</a></p>"
+        )
+        return build_message([to], title, "\n".join(lines), html)
+
+    async def _generate_one(self, manager: dict, period: str, start: datetime, end: datetime) -> Optional[dict]:
+        key = report_id(period, str(manager["_id"]), start)
+        if not await self._claim(key):
+            return None
+        try:
+            report = await self.build(manager, period, start, end)
+        except Exception as e:
+            # Released so the next run (or another worker) retries it
+            await self.reports().update_one(
+                {"_id": key},
+                {"$set": {"status": "failed", "error": str(e)}, "$unset": {"claimed_at": ""}}
+            )
+            print(f"Error generating {key}: {e}")
+            return None
+
+        await self.reports().update_one(
+            {"_id": key},
+            {"$set": {**report, "status": "ready", "emailed": False, "generated_at": datetime.utcnow()}}
+        )
+        if self.send_email and manager.get("email"):
+            try:
+                await smtp_pool.send(self._message(report, manager["email"]))
+                await self.reports().update_one({"_id": key}, {"$set": {"emailed": True}})
+            except Exception as e:
+                print(f"Error emailing {key}: {e}")
+        return report
+
+    async def generate(self, period: str, day: date) -> dict:
+        """
+        Build (and email) the period's report for every active manager,
+        at most `concurrency` at a time
+        Returns counts of generated and skipped reports
+        """
+        start, end = report_range(period, day)
+        managers = await get_analytics_collection("users").find(
+            {"role": "manager", "is_active": {"$ne": False}},
+            {"full_name": 1, "email": 1}
+        ).to_list(None)
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def generate_limited(manager: dict):
+            async with limit:
+                return await self._generate_one(manager, period, start, end)
+
+        results = await asyncio.gather(*(generate_limited(manager) for manager in managers))
+        generated = sum(report is not None for report in results)
+
+        if self.send_email and settings.MANAGER_EMAIL:
+            await self._send_summary(period, start, end)
+
+        return {"period": period, "start_date": start.strftime("%Y-%m-%d"), "managers": len(managers), "generated": generated}
+
+    async def _send_summary(self, period: str, start: datetime, end: datetime):
+        """
+        Email MANAGER_EMAIL one all-teams summary built from the stored
+        reports of the period. Claimed under its own id, and only once no
+        worker is still building a team report, so it is sent once and
+        covers every team.
+        """
+        start_date = start.strftime("%Y-%m-%d")
+        team_reports = {"period": period, "start_date": start_date, "manager_id": {"$exists": True}}
+        building = await self.reports().count_documents({
+            **team_reports,
+            "status": "building",
+            "claimed_at": {"$gte": datetime.utcnow() - CLAIM_TIMEOUT}
+        })
+        if building:
+            return
+
+        reports = await self.reports().find({**team_reports, "status": "ready"}).sort("manager_name", 1).to_list(None)
+        key = report_id(period, "summary", start)
+        if not reports or not await self._claim(key):
+            return
+
+        summary = {
+            "period": period,
+            "manager_name": "All teams",
+            "start_date": start_date,
+            "end_date": (end - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "employees": [
+                {"user_name": report["manager_name"] or report["manager_id"], "total_hours": report["total_hours"],
+                 "sessions": sum(row["sessions"] for row in report["employees"])}
+                for report in reports
+            ],
+            "total_hours": round(sum(report["total_hours"] for report in reports), 2)
+        }
+        try:
+            await smtp_pool.send(self._message(summary, settings.MANAGER_EMAIL))
+        except Exception as e:
+            await self.reports().update_one(
+                {"_id": key},
+                {"$set": {"status": "failed", "error": str(e)}, "$unset": {"claimed_at": ""}}
+            )
+            print(f"Error sending report summary: {e}")
+            return
+        await self.reports().update_one(
+            {"_id": key},
+            {"$set": {**summary, "status": "ready", "emailed": True, "generated_at": datetime.utcnow()}}
+        )
+
+    async def cached(self, manager_id: str, period: str, day: Optional[date] = None) -> Optional[dict]:
+        """The stored report covering `day`, or the most recent one"""
+        query = {"manager_id": manager_id, "period": period, "status": "ready"}
+        if day is not None:
+            query["_id"] = report_id(period, manager_id, report_range(period, day)[0])
+        return await self.reports().find_one(query, {"claimed_at": 0}, sort=[("start_date", -1)])
+
+    async def run(self):
+        """
+        Background loop: every day at run_at (server local time) build
+        yesterday's daily reports, and on weekly_day the weekly reports of
+        the last completed Monday-Sunday week
+        """
+        while True:
+            await asyncio.sleep(max(next_occurrence(self.run_at, datetime.now()) - datetime.now().timestamp(), 1))
+            today = datetime.utcnow().date()
+            try:
+                print(f"📊 Reports: {await self.generate('daily', today - timedelta(days=1))}")
+                if datetime.now().weekday() == self.weekly_day:
+                    last_week = today - timedelta(days=today.weekday() + 1)
+                    print(f"📊 Reports: {await self.generate('weekly', last_week)}")
+            except Exception as e:
+                print(f"Error in report scheduler: {e}")
+            finally:
+                await smtp_pool.close()
+            # Past run_at now; don't fire twice within the same minute
+            await asyncio.sleep(60)
+
+# Global instance
+report_service = ReportService()
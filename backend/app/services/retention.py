@@ -0,0 +1,198 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import gzip
+import os
+import re
+from bson import json_util
+from pymongo import ReplaceOne, UpdateOne
+from app.core.config import settings
+from app.core.database import get_collection
+
+# Canonical extended JSON round-trips ObjectId, datetime and int64 exactly
+ARCHIVE_JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS
+MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+
+class RetentionService:
+    """
+    Keeps work_sessions small. Completed sessions older than the retention
+    age are written in full to monthly gzip-NDJSON archives, then compacted
+    in place to summary-only documents (the embedded eye_detection_logs are
+    dropped). Archived sessions can be restored for audits; restored
+    sessions are stamped with restored_at and left alone for the restore
+    grace period, after which the next run compacts them again.
+    """
+
+    def __init__(
+        self,
+        archive_dir: str = settings.RETENTION_ARCHIVE_DIR,
+        compact_after_days: int = settings.RETENTION_COMPACT_AFTER_DAYS,
+        batch_size: int = settings.RETENTION_BATCH_SIZE,
+        restore_grace_days: int = settings.RETENTION_RESTORE_GRACE_DAYS
+    ):
+        self.archive_dir = os.path.join(archive_dir, "work_sessions")
+        self.compact_after_days = compact_after_days
+        self.batch_size = batch_size
+        self.restore_grace = timedelta(days=restore_grace_days)
+
+    def _archive_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"{month}.ndjson.gz")
+
+    def _write_archive(self, by_month: Dict[str, List[dict]]):
+        """
+        Append sessions to their month's archive and fsync before the
+        originals are compacted. Each append is a separate gzip member,
+        which gzip readers treat as one continuous stream. A restored
+        session that is compacted again is appended again; readers keep
+        the last copy of each session, so re-archiving is idempotent.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for month, documents in by_month.items():
+            with open(self._archive_path(month), "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="ab") as f:
+                    for doc in documents:
+                        doc = {key: value for key, value in doc.items() if key != "restored_at"}
+                        f.write(json_util.dumps(doc, json_options=ARCHIVE_JSON_OPTIONS).encode("utf-8"))
+                        f.write(b"\n")
+                raw.flush()
+                os.fsync(raw.fileno())
+
+    def _read_archive(
+        self,
+        month: str,
+        user_id: Optional[str],
+        session_ids: Optional[List[str]]
+    ) -> List[dict]:
+        """Matching sessions from a month's archive, last copy of each winning"""
+        wanted = set(session_ids) if session_ids else None
+        documents = {}
+        with gzip.open(self._archive_path(month), "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                doc = json_util.loads(line)
+                if user_id and doc.get("user_id") != user_id:
+                    continue
+                if wanted is not None and str(doc["_id"]) not in wanted:
+                    continue
+                # A crash between archiving and compacting can archive a session twice
+                documents[doc["_id"]] = doc
+        return list(documents.values())
+
+    def _summary(self, session: dict, now: datetime, month: str) -> dict:
+        logs = session.get("eye_detection_logs") or []
+        return {
+            "compacted": True,
+            "compacted_at": now,
+            "archive_month": month,
+            "log_count": len(logs),
+            "logged_seconds": sum(log.get("duration", 0) for log in logs),
+            "updated_at": now
+        }
+
+    async def compact(self, now: Optional[datetime] = None, dry_run: bool = False) -> dict:
+        """Archive and compact completed sessions older than the retention age"""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.compact_after_days)
+        sessions_collection = get_collection("work_sessions")
+        loop = asyncio.get_running_loop()
+
+        query = {
+            "status": "completed",
+            "start_time": {"$lt": cutoff},
+            "compacted": {"$ne": True},
+            # Restored for an audit: kept in full for the grace period only
+            "$or": [
+                {"restored_at": {"$exists": False}},
+                {"restored_at": {"$lt": now - self.restore_grace}}
+            ]
+        }
+        stats = {"cutoff": cutoff, "sessions": 0, "logs": 0, "months": set()}
+        last_id = None
+
+        while True:
+            batch_query = dict(query)
+            if last_id is not None:
+                batch_query["_id"] = {"$gt": last_id}
+            batch = await sessions_collection.find(batch_query).sort("_id", 1).limit(self.batch_size).to_list(None)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+
+            by_month = defaultdict(list)
+            for session in batch:
+                by_month[session["start_time"].strftime("%Y-%m")].append(session)
+
+            stats["sessions"] += len(batch)
+            stats["logs"] += sum(len(s.get("eye_detection_logs") or []) for s in batch)
+            stats["months"].update(by_month)
+            if dry_run:
+                continue
+
+            # Archive first: if the process dies here the sessions are merely archived twice
+            await loop.run_in_executor(None, self._write_archive, by_month)
+
+            operations = [
+                UpdateOne(
+                    # Skipped if the session was restored again in the meantime
+                    {"_id": session["_id"], "compacted": {"$ne": True}, "restored_at": session.get("restored_at")},
+                    {
+                        "$set": self._summary(session, now, month),
+                        "$unset": {"eye_detection_logs": "", "restored_at": ""}
+                    }
+                )
+                for month, sessions in by_month.items()
+                for session in sessions
+            ]
+            await sessions_collection.bulk_write(operations, ordered=False)
+
+        stats["months"] = sorted(stats["months"])
+        return stats
+
+    def archives(self) -> List[dict]:
+        """Available monthly archives"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        archives = []
+        for name in sorted(os.listdir(self.archive_dir)):
+            if not name.endswith(".ndjson.gz"):
+                continue
+            archives.append({
+                "month": name[:-len(".ndjson.gz")],
+                "size": os.path.getsize(os.path.join(self.archive_dir, name))
+            })
+        return archives
+
+    async def restore(
+        self,
+        month: str,
+        user_id: Optional[str] = None,
+        session_ids: Optional[List[str]] = None
+    ) -> int:
+        """
+        Put archived sessions back in full (logs included, compaction
+        markers gone), stamped with restored_at so compaction leaves them
+        alone for the restore grace period. Returns the number of sessions
+        restored.
+        """
+        if not MONTH_PATTERN.match(month) or not os.path.isfile(self._archive_path(month)):
+            raise FileNotFoundError(f"No archive for {month}")
+
+        loop = asyncio.get_running_loop()
+        documents = await loop.run_in_executor(None, self._read_archive, month, user_id, session_ids)
+
+        sessions_collection = get_collection("work_sessions")
+        now = datetime.utcnow()
+        for i in range(0, len(documents), self.batch_size):
+            await sessions_collection.bulk_write(
+                [
+                    ReplaceOne({"_id": doc["_id"]}, {**doc, "updated_at": now, "restored_at": now}, upsert=True)
+                    for doc in documents[i:i + self.batch_size]
+                ],
+                ordered=False
+            )
+        return len(documents)
+
+# Global instance
+retention_service = RetentionService()
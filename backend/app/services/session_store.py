@@ -0,0 +1,186 @@
+import heapq
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+class SessionStore:
+    """
+    Columnar (struct-of-arrays) storage for in-memory monitoring state.
+    Each monitored user owns a slot index; per-session fields live in
+    parallel NumPy arrays so the whole population can be scanned or
+    advanced with vectorized operations. Timestamps are epoch seconds.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._size = 0  # high-water mark of slots ever handed out
+        # One (deadline key, slot, generation) entry per idle-tracked session,
+        # ordered by the last_seen it was queued with. touch() never writes
+        # to it; a sweep only pops entries whose key is past the cutoff and
+        # re-queues the ones that have seen frames since. Entries of removed
+        # or re-added slots are skipped via the slot's generation.
+        self._idle_heap: List[Tuple[float, int, int]] = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = np.zeros(capacity, dtype=bool)
+        self.user_ids = np.zeros(capacity, dtype="S24")
+        self.session_ids = np.zeros(capacity, dtype="S24")
+        self.start_time = np.zeros(capacity, dtype=np.float64)
+        self.last_activity = np.zeros(capacity, dtype=np.float64)
+        # Last frame of any kind, used for idle detection
+        self.last_seen = np.zeros(capacity, dtype=np.float64)
+        # Only tracked sessions are considered by idle_users()
+        self.idle_tracked = np.zeros(capacity, dtype=bool)
+        self.generation = np.zeros(capacity, dtype=np.int64)
+        self.active_seconds = np.zeros(capacity, dtype=np.int64)
+        # NaN means no eye detection window is open
+        self.window_start = np.full(capacity, np.nan, dtype=np.float64)
+        self.window_time = np.zeros(capacity, dtype=np.float64)
+
+    def _grow(self):
+        """Double capacity, copying existing columns"""
+        old = {
+            name: getattr(self, name)
+            for name in (
+                "in_use", "user_ids", "session_ids", "start_time",
+                "last_activity", "last_seen", "idle_tracked", "generation", "active_seconds",
+                "window_start", "window_time"
+            )
+        }
+        self._allocate(self.capacity * 2)
+        for name, column in old.items():
+            getattr(self, name)[:len(column)] = column
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._slots
+
+    def slot(self, user_id: str) -> Optional[int]:
+        """Slot index for a user, or None if not monitored"""
+        return self._slots.get(user_id)
+
+    def user_id(self, slot: int) -> str:
+        return self.user_ids[slot].decode()
+
+    def session_id(self, slot: int) -> str:
+        return self.session_ids[slot].decode()
+
+    def add(self, user_id: str, session_id: str, now: float, track_idle: bool = True) -> int:
+        """
+        Claim (or reset) the slot for a user
+        Sessions added with track_idle=False are only considered idle after
+        their first touch()
+        """
+        slot = self._slots.get(user_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                if self._size == self.capacity:
+                    self._grow()
+                slot = self._size
+                self._size += 1
+            self._slots[user_id] = slot
+
+        self.in_use[slot] = True
+        self.user_ids[slot] = user_id.encode()
+        self.session_ids[slot] = session_id.encode()
+        self.start_time[slot] = now
+        self.last_activity[slot] = now
+        self.last_seen[slot] = now
+        self.active_seconds[slot] = 0
+        self.window_start[slot] = np.nan
+        self.window_time[slot] = 0.0
+        self.idle_tracked[slot] = track_idle
+        self.generation[slot] += 1
+        if track_idle:
+            heapq.heappush(self._idle_heap, (now, slot, int(self.generation[slot])))
+        return slot
+
+    def remove(self, user_id: str) -> bool:
+        """Release a user's slot"""
+        slot = self._slots.pop(user_id, None)
+        if slot is None:
+            return False
+        self.in_use[slot] = False
+        self.idle_tracked[slot] = False
+        self.generation[slot] += 1
+        self.user_ids[slot] = b""
+        self.session_ids[slot] = b""
+        self.window_start[slot] = np.nan
+        self.window_time[slot] = 0.0
+        self._free.append(slot)
+        return True
+
+    def _push_idle(self, entries: List[Tuple[float, int, int]]):
+        if len(entries) > len(self._idle_heap) // 8:
+            self._idle_heap.extend(entries)
+            heapq.heapify(self._idle_heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self._idle_heap, entry)
+
+    def touch(self, slots: np.ndarray, now):
+        """Record that frames arrived for these slots (now: scalar or per slot)"""
+        self.last_seen[slots] = now
+        # Sessions added with track_idle=False join the idle order on their first frame
+        untracked = slots[~self.idle_tracked[slots]]
+        if len(untracked):
+            self.idle_tracked[untracked] = True
+            self._push_idle(list(zip(
+                self.last_seen[untracked].tolist(), untracked.tolist(), self.generation[untracked].tolist()
+            )))
+
+    def idle_users(self, cutoff: float) -> List[str]:
+        """
+        Users with no frame since cutoff, oldest first. Only entries queued
+        before the cutoff are popped, so the sweep does not scan every
+        session; each active session is re-queued at most once per idle
+        timeout.
+        """
+        heap = self._idle_heap
+        idle, requeue = [], []
+        while heap and heap[0][0] <= cutoff:
+            _, slot, generation = heapq.heappop(heap)
+            if not self.in_use[slot] or self.generation[slot] != generation:
+                continue
+            entry = (float(self.last_seen[slot]), slot, generation)
+            (idle if entry[0] <= cutoff else requeue).append(entry)
+        # Idle entries stay queued until the caller ends them (remove() invalidates them)
+        self._push_idle(requeue + idle)
+        idle.sort()
+        return [self.user_id(slot) for _, slot, _ in idle]
+
+    def active_slots(self) -> np.ndarray:
+        """Indices of all slots currently in use"""
+        return np.nonzero(self.in_use[:self._size])[0]
+
+    def expire_windows(
+        self,
+        now,
+        max_gap: float,
+        slots: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Close every open eye detection window whose last activity is older
+        than max_gap, among `slots` (default: all sessions). now is one
+        timestamp or one per slot.
+        Returns: (slots, durations) of the windows that were closed, each
+        duration running from the window start to its last detection
+        """
+        if slots is None:
+            slots = self.active_slots()
+        stale = (
+            self.in_use[slots]
+            & ~np.isnan(self.window_start[slots])
+            & ((now - self.last_activity[slots]) > max_gap)
+        )
+        slots = slots[stale]
+        durations = self.last_activity[slots] - self.window_start[slots]
+        self.window_start[slots] = np.nan
+        self.window_time[slots] = 0.0
+        return slots, durations
@@ -0,0 +1,222 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+import asyncio
+import heapq
+import itertools
+import time
+from pymongo.errors import BulkWriteError
+from app.core.database import get_collection
+from app.services.monitoring import monitoring_service, new_session_document
+
+SHIFT_START = "start"
+SHIFT_END = "end"
+
+def next_occurrence(hhmm: str, now: datetime, grace: timedelta = timedelta(0)) -> float:
+    """
+    Epoch time of the next local HH:MM at or after now.
+    A time that passed less than `grace` ago counts as now.
+    """
+    hour, minute = (int(part) for part in hhmm.split(":"))
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate + grace < now:
+        candidate += timedelta(days=1)
+    return candidate.timestamp()
+
+class ShiftScheduler:
+    """
+    Starts and stops monitoring sessions at shift boundaries.
+    All upcoming shift starts/ends live in one time-ordered heap, so each
+    event costs O(log n) instead of polling every user's shift. Entries are
+    invalidated lazily: changing a user's shift bumps their version and
+    stale heap entries are skipped when popped. Every worker runs its own
+    scheduler; a shift start is claimed in shift_claims before its session
+    is created, so only one worker starts it.
+    """
+
+    def __init__(self, start_grace_minutes: int = 15, max_sleep: float = 60):
+        self.start_grace = timedelta(minutes=start_grace_minutes)
+        self.max_sleep = max_sleep  # re-check periodically in case of clock jumps
+        # (fire_at, seq, user_id, kind, version)
+        self._heap: List[Tuple[float, int, str, str, int]] = []
+        self._seq = itertools.count()
+        self._versions: Dict[str, int] = {}
+        # user_id -> user document (_id, full_name, shift_start, shift_end, manager_id)
+        self._users: Dict[str, dict] = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _push(self, user_id: str, kind: str, fire_at: float):
+        heapq.heappush(
+            self._heap,
+            (fire_at, next(self._seq), user_id, kind, self._versions[user_id])
+        )
+
+    def _schedule_user(self, user_id: str, now: datetime, initial: bool = False):
+        user = self._users[user_id]
+        # On (re)load, a shift that started within the grace period still auto-starts
+        grace = self.start_grace if initial else timedelta(0)
+        self._push(user_id, SHIFT_START, next_occurrence(user["shift_start"], now, grace))
+        self._push(user_id, SHIFT_END, next_occurrence(user["shift_end"], now))
+
+    def update_user(self, user: dict):
+        """Add or replace a user's shift (call after the shift is changed)"""
+        user_id = str(user["_id"])
+        if not user.get("shift_start") or not user.get("shift_end") or not user.get("is_active", True):
+            self.remove_user(user_id)
+            return
+
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self._users[user_id] = {
+            "_id": user["_id"],
+            "full_name": user["full_name"],
+            "shift_start": user["shift_start"],
+            "shift_end": user["shift_end"],
+            "manager_id": user.get("manager_id")
+        }
+        self._schedule_user(user_id, datetime.now(), initial=True)
+        self._wakeup.set()
+
+    def remove_user(self, user_id: str):
+        """Stop scheduling a user; their queued events become stale"""
+        if self._users.pop(user_id, None) is not None:
+            self._versions[user_id] += 1
+
+    async def load(self):
+        """Load every user with a shift and build the heap"""
+        users_collection = get_collection("users")
+        cursor = users_collection.find(
+            {
+                "shift_start": {"$exists": True, "$ne": None},
+                "shift_end": {"$exists": True, "$ne": None},
+                "full_name": {"$exists": True},
+                "is_active": {"$ne": False}
+            },
+            {"full_name": 1, "shift_start": 1, "shift_end": 1, "manager_id": 1}
+        )
+
+        self._heap = []
+        now = datetime.now()
+        async for user in cursor:
+            user_id = str(user["_id"])
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._users[user_id] = user
+            self._schedule_user(user_id, now, initial=True)
+
+        print(f"📅 Shift scheduler loaded {len(self._users)} shifts")
+
+    def _pop_due(self, now: float) -> Tuple[List[Tuple[str, float]], List[str]]:
+        """
+        Pop all events due by now and queue each user's next occurrence
+        Returns: ([(user_id, shift start time)], [user_id of shifts ending])
+        """
+        starts, stops = [], []
+        local_now = datetime.fromtimestamp(now)
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, user_id, kind, version = heapq.heappop(self._heap)
+            if self._versions.get(user_id) != version or user_id not in self._users:
+                continue  # shift changed or removed since this was queued
+
+            user = self._users[user_id]
+            if kind == SHIFT_START:
+                starts.append((user_id, fire_at))
+                next_at = next_occurrence(user["shift_start"], local_now + timedelta(minutes=1))
+            else:
+                stops.append(user_id)
+                next_at = next_occurrence(user["shift_end"], local_now + timedelta(minutes=1))
+            self._push(user_id, kind, next_at)
+
+        return starts, stops
+
+    async def _claim_starts(self, starts: List[Tuple[str, float]]) -> List[str]:
+        """
+        Claim shift starts for this worker; every worker fires at the same
+        boundary and the unique _id lets exactly one of them win each start
+        Returns the user_ids this worker claimed
+        """
+        now = datetime.utcnow()
+        claims = [
+            {"_id": f"{user_id}:{int(fire_at)}", "user_id": user_id, "claimed_at": now}
+            for user_id, fire_at in starts
+        ]
+        try:
+            await get_collection("shift_claims").insert_many(claims, ordered=False)
+            return [claim["user_id"] for claim in claims]
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != 11000 for error in errors):
+                raise
+            lost = {error["index"] for error in errors}
+            return [claim["user_id"] for index, claim in enumerate(claims) if index not in lost]
+
+    async def _start_sessions(self, starts: List[Tuple[str, float]]):
+        """Create sessions for claimed users without one, in one query and one insert"""
+        user_ids = await self._claim_starts(starts)
+        if not user_ids:
+            return
+        sessions_collection = get_collection("work_sessions")
+
+        busy = set()
+        async for session in sessions_collection.find(
+            {"user_id": {"$in": user_ids}, "status": {"$in": ["active", "paused"]}},
+            {"user_id": 1}
+        ):
+            busy.add(session["user_id"])
+
+        to_start = [
+            user_id for user_id in user_ids
+            if user_id not in busy and user_id not in monitoring_service.sessions
+        ]
+        if not to_start:
+            return
+
+        documents = []
+        for user_id in to_start:
+            document = new_session_document(self._users[user_id], monitoring_service.owner)
+            document["auto_started"] = True
+            documents.append(document)
+
+        result = await sessions_collection.insert_many(documents)
+        for user_id, session_id in zip(to_start, result.inserted_ids):
+            # Not reaped for inactivity until the employee's camera sends a frame
+            await monitoring_service.start_monitoring(
+                user_id,
+                str(session_id),
+                track_idle=False,
+                manager_id=self._users[user_id].get("manager_id")
+            )
+
+        print(f"📅 Auto-started {len(to_start)} shift sessions")
+
+    async def _stop_sessions(self, user_ids: List[str]):
+        ended = await monitoring_service.end_sessions(user_ids)
+        if ended:
+            print(f"📅 Auto-stopped {ended} shift sessions")
+
+    def _sleep_time(self) -> float:
+        if not self._heap:
+            return self.max_sleep
+        return min(max(self._heap[0][0] - time.time(), 0), self.max_sleep)
+
+    async def run(self):
+        """Background loop: sleep until the next shift boundary and act on it"""
+        await self.load()
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._sleep_time())
+            except asyncio.TimeoutError:
+                pass
+
+            starts, stops = self._pop_due(time.time())
+            try:
+                if stops:
+                    await self._stop_sessions(stops)
+                if starts:
+                    await self._start_sessions(starts)
+            except Exception as e:
+                print(f"Error in shift scheduler: {e}")
+
+# Global instance
+shift_scheduler = ShiftScheduler()
@@ -0,0 +1,181 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+import asyncio
+import threading
+import time
+import cv2
+import numpy as np
+from app.core.config import settings
+from app.services.detectors import create_detector
+from app.services.monitoring import ManualClock, MonitoringService
+
+# Webcam frames from the frontend are about this wide; larger video frames
+# are scaled down so detection behaves as it did live
+AUDIT_FRAME_WIDTH = 640
+
+class SampledFrames:
+    """
+    Sequential reader that decodes a video and keeps every Nth frame.
+    Skipped frames are only grabbed, never converted, and nothing beyond
+    the requested chunk is held in memory.
+    """
+
+    def __init__(self, path: str, sample_fps: float):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError("Could not open video")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.step = max(self.fps / sample_fps, 1.0)
+        self.decoded = 0
+        self._next_sample = 0.0
+
+    def read_chunk(self, size: int) -> List[Tuple[float, np.ndarray]]:
+        """Next (offset seconds, frame) samples, empty at end of video"""
+        chunk = []
+        while len(chunk) < size:
+            if not self.capture.grab():
+                break
+            index = self.decoded
+            self.decoded += 1
+            if index < self._next_sample:
+                continue
+            self._next_sample += self.step
+            ok, frame = self.capture.retrieve()
+            if not ok:
+                continue
+            if frame.shape[1] > AUDIT_FRAME_WIDTH:
+                scale = AUDIT_FRAME_WIDTH / frame.shape[1]
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            chunk.append((index / self.fps, frame))
+        return chunk
+
+    def close(self):
+        self.capture.release()
+
+class _WindowCollector:
+    """Sink that keeps the log entries instead of writing them"""
+
+    def __init__(self):
+        self.entries: List[dict] = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.entries.extend(operations)
+
+class _AuditMonitoringService(MonitoringService):
+    """MonitoringService whose log writes are plain entries for the collector"""
+
+    def _log_operation(self, slot: int, completed: bool, duration: int, at: float) -> dict:
+        return {
+            "timestamp": datetime.utcfromtimestamp(at),
+            "eyes_detected": completed,
+            "duration": duration,
+            "total_active_time": int(self.sessions.active_seconds[slot])
+        }
+
+class VideoAuditor:
+    """
+    Re-run monitoring over a recorded clip. One thread decodes and samples
+    frames while a pool detects on whole chunks; at most `workers` chunks
+    are in flight, so memory stays flat however long the video is.
+    Detections are replayed in order through MonitoringService on a clock
+    set to each frame's capture time.
+    """
+
+    def __init__(
+        self,
+        backend: str = settings.FACE_DETECTOR_BACKEND,
+        workers: int = settings.VIDEO_AUDIT_WORKERS,
+        chunk_frames: int = settings.VIDEO_AUDIT_CHUNK_FRAMES
+    ):
+        self.backend = backend
+        self.workers = workers
+        self.chunk_frames = chunk_frames
+        self._local = threading.local()
+
+    def _detect_chunk(self, chunk: List[Tuple[float, np.ndarray]]) -> List[Tuple[float, bool, bool]]:
+        # Detectors are not shared between threads
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = create_detector(self.backend)
+        results = []
+        for offset, frame in chunk:
+            face_detected, eyes_detected, _, _ = detector.detect_regions(frame)
+            results.append((offset, face_detected, eyes_detected))
+        return results
+
+    async def audit(self, path: str, started_at: datetime, sample_fps: float) -> dict:
+        """
+        Process a video recorded from started_at (UTC)
+        Returns the eye detection windows and active time monitoring
+        would have produced
+        """
+        started = time.perf_counter()
+        origin = (started_at - datetime(1970, 1, 1)).total_seconds()
+        clock = ManualClock(origin)
+        collector = _WindowCollector()
+        monitor = _AuditMonitoringService(clock=clock, sessions_collection=collector)
+        await monitor.start_monitoring("audit", "0" * 24)
+        slot = np.array([monitor.sessions.slot("audit")])
+
+        loop = asyncio.get_running_loop()
+        decoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-decode")
+        detectors = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="video-detect")
+        reader: Optional[SampledFrames] = None
+
+        pending = deque()
+        exhausted = False
+        samples = faces = eyes = 0
+        next_tick = origin + monitor.reaper_interval
+        try:
+            reader = await loop.run_in_executor(decoder, SampledFrames, path, sample_fps)
+            while True:
+                while not exhausted and len(pending) < self.workers:
+                    chunk = await loop.run_in_executor(decoder, reader.read_chunk, self.chunk_frames)
+                    if not chunk:
+                        exhausted = True
+                        break
+                    pending.append(loop.run_in_executor(detectors, self._detect_chunk, chunk))
+                if not pending:
+                    break
+
+                for offset, face_detected, eyes_detected in await pending.popleft():
+                    at = origin + offset
+                    # The live reaper closes stale windows on its own interval
+                    while next_tick <= at:
+                        clock.now = next_tick
+                        await monitor.tick()
+                        next_tick += monitor.reaper_interval
+                    clock.now = at
+                    await monitor.process_detections(slot, np.array([eyes_detected]))
+                    samples += 1
+                    faces += face_detected
+                    eyes += eyes_detected
+        finally:
+            for future in pending:
+                future.cancel()
+            if reader is not None:
+                await loop.run_in_executor(decoder, reader.close)
+            decoder.shutdown(wait=False)
+            detectors.shutdown(wait=False)
+
+        # Frames stop at the end of the clip: let the reaper close the last window
+        clock.now += monitor.max_detection_gap + monitor.reaper_interval
+        await monitor.tick()
+
+        return {
+            "started_at": started_at,
+            "video_seconds": round(reader.decoded / reader.fps, 2),
+            "frames_decoded": reader.decoded,
+            "frames_sampled": samples,
+            "sample_fps": sample_fps,
+            "face_frames": faces,
+            "eye_frames": eyes,
+            "total_active_time": int(monitor.sessions.active_seconds[slot[0]]),
+            "eye_detection_logs": collector.entries,
+            "processing_seconds": round(time.perf_counter() - started, 2)
+        }
+
+# Global instance
+video_auditor = VideoAuditor()
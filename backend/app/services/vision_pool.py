@@ -0,0 +1,228 @@
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import threading
+import numpy as np
+from app.core.config import settings
+
+# (face_detected, eyes_detected, confidence, regions)
+DetectionResult = Tuple[bool, bool, float, List[tuple]]
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to a parent-owned block without letting this process unlink it"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+def _default_detector():
+    from app.services.detectors import create_detector
+    return create_detector(settings.FACE_DETECTOR_BACKEND)
+
+def _worker_main(job_queue, result_queue, slot_names: List[str], detector_factory: Callable):
+    """Vision worker process: run detection on frames placed in shared memory"""
+    detector = detector_factory()
+    slots = [_attach(name) for name in slot_names]
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        job_id, slot, shape = job
+        try:
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+            result_queue.put((job_id, detector.detect_regions(frame), None))
+        except Exception as e:
+            result_queue.put((job_id, None, repr(e)))
+
+    for shm in slots:
+        shm.close()
+
+class LocalTransport:
+    """
+    Job/result transport between the API process and vision workers on the
+    same host, built on multiprocessing queues. Each worker has its own job
+    queue so the pool knows which jobs a crashed worker took with it. Only
+    (job_id, slot, shape) tuples cross the queues; pixels stay in shared
+    memory.
+    """
+
+    def __init__(self, context, workers: int):
+        self.context = context
+        self.jobs = [context.Queue() for _ in range(workers)]
+        self.results = context.Queue()
+
+    def submit(self, worker: int, job: tuple):
+        self.jobs[worker].put(job)
+
+    def replace(self, worker: int):
+        """Fresh job queue for a respawned worker; jobs queued to the dead one are dropped"""
+        self.jobs[worker] = self.context.Queue()
+        return self.jobs[worker]
+
+    def next_result(self, timeout: float) -> Optional[tuple]:
+        """Next result, or None on timeout"""
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        for jobs in self.jobs:
+            jobs.put(None)
+
+class VisionPool:
+    """
+    Pool of out-of-process vision workers. Decoded frames are copied once
+    into a free shared-memory slot and detection results flow back to the
+    awaiting request, which then updates MonitoringService as usual.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.VISION_WORKERS,
+        slot_bytes: int = settings.VISION_SHM_SLOT_BYTES,
+        job_timeout: float = settings.VISION_JOB_TIMEOUT_SECONDS,
+        detector_factory: Callable = _default_detector
+    ):
+        self.workers = workers
+        self.slot_bytes = slot_bytes
+        self.job_timeout = job_timeout
+        # Picklable callable that builds a detector inside each worker
+        self.detector_factory = detector_factory
+        self.running = False
+        self._ids = itertools.count()
+        # job_id -> (future, slot, worker)
+        self._pending: Dict[int, Tuple[asyncio.Future, int, int]] = {}
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "timed_out": 0, "inline": 0, "restarts": 0}
+
+    def _spawn(self, worker: int, jobs):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(jobs, self._transport.results, [shm.name for shm in self._slots], self.detector_factory),
+            name=f"vision-worker-{worker}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def start(self):
+        if self.workers <= 0:
+            return
+        self._context = multiprocessing.get_context("spawn")
+        self._loop = asyncio.get_running_loop()
+        self._transport = LocalTransport(self._context, self.workers)
+        self._slots = [
+            shared_memory.SharedMemory(create=True, size=self.slot_bytes)
+            for _ in range(self.workers * 2)
+        ]
+        self._free_slots: asyncio.Queue = asyncio.Queue()
+        for index in range(len(self._slots)):
+            self._free_slots.put_nowait(index)
+        self._in_flight = [0] * self.workers
+
+        self._processes = [self._spawn(i, self._transport.jobs[i]) for i in range(self.workers)]
+
+        self.running = True
+        self._collector = threading.Thread(target=self._collect_results, name="vision-results", daemon=True)
+        self._collector.start()
+        print(f"👁️ Started {self.workers} vision workers")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._transport.close()
+        for process in self._processes:
+            process.join(timeout=5)
+        self._collector.join(timeout=5)
+        for shm in self._slots:
+            shm.close()
+            shm.unlink()
+
+    def _collect_results(self):
+        """
+        Runs in a thread: hand worker results back to the event loop, and
+        report workers that exited without being asked to
+        """
+        while self.running:
+            message = self._transport.next_result(timeout=0.5)
+            if message is not None:
+                self._loop.call_soon_threadsafe(self._resolve, *message)
+            for worker, process in enumerate(self._processes):
+                if process.exitcode is not None:
+                    self._loop.call_soon_threadsafe(self._worker_died, worker, process)
+
+    def _worker_died(self, worker: int, process):
+        """Fail the dead worker's jobs, reclaim their slots and respawn it"""
+        if not self.running or self._processes[worker] is not process:
+            return  # already handled
+        lost = [job_id for job_id, (_, _, owner) in self._pending.items() if owner == worker]
+        for job_id in lost:
+            future, slot, _ = self._pending.pop(job_id)
+            self._free_slots.put_nowait(slot)
+            if not future.done():
+                self.stats["failed"] += 1
+                future.set_exception(RuntimeError(f"Vision worker exited with code {process.exitcode}"))
+        self._in_flight[worker] = 0
+        self._processes[worker] = self._spawn(worker, self._transport.replace(worker))
+        self.stats["restarts"] += 1
+        print(f"⚠️ Vision worker {worker} exited with code {process.exitcode}; respawned, {len(lost)} jobs failed")
+
+    def _resolve(self, job_id: int, result: Optional[DetectionResult], error: Optional[str]):
+        entry = self._pending.pop(job_id, None)
+        if entry is None:
+            return
+        future, slot, worker = entry
+        # The worker is done with the slot even if the request gave up waiting
+        self._free_slots.put_nowait(slot)
+        self._in_flight[worker] -= 1
+        if future.done():
+            return
+        if error is not None:
+            self.stats["failed"] += 1
+            future.set_exception(RuntimeError(error))
+        else:
+            self.stats["completed"] += 1
+            future.set_result(result)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "pending": len(self._pending),
+            **self.stats
+        }
+
+    async def detect_regions(self, frame: np.ndarray) -> DetectionResult:
+        """Detect faces/eyes, out of process when the pool is running"""
+        if not self.running or frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            self.stats["inline"] += 1
+            from app.services.face_recognition import face_service
+            return face_service.detect_regions(frame)
+
+        slot = await asyncio.wait_for(self._free_slots.get(), self.job_timeout)
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=self._slots[slot].buf)[:] = frame
+
+        job_id = next(self._ids)
+        future = self._loop.create_future()
+        worker = min(range(self.workers), key=self._in_flight.__getitem__)
+        self._pending[job_id] = (future, slot, worker)
+        self._in_flight[worker] += 1
+        self._transport.submit(worker, (job_id, slot, frame.shape))
+        self.stats["submitted"] += 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.job_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise
+
+# Global instance
+vision_pool = VisionPool()
@@ -0,0 +1,107 @@
+"""
+Benchmark face detector backends on a labelled fixture set.
+
+The fixture directory is expected to contain one sub-folder per label:
+
+    fixtures/
+        eyes_open/     face present, eyes open
+        eyes_closed/   face present, eyes closed or looking away
+        no_face/       nobody in front of the camera
+
+Usage:
+    python benchmark_detectors.py fixtures/ --backends haar lbp yunet ssd
+"""
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from app.services.detectors import DETECTOR_BACKENDS, create_detector
+
+LABELS = {
+    # label -> (face expected, eyes expected)
+    "eyes_open": (True, True),
+    "eyes_closed": (True, False),
+    "no_face": (False, False),
+}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def load_fixtures(fixture_dir: str):
+    """Load (image, face_expected, eyes_expected) tuples from the fixture directory"""
+    fixtures = []
+    for label, expected in LABELS.items():
+        label_dir = os.path.join(fixture_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for name in sorted(os.listdir(label_dir)):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image = cv2.imread(os.path.join(label_dir, name))
+            if image is not None:
+                fixtures.append((image, expected[0], expected[1]))
+    return fixtures
+
+def benchmark(backend: str, fixtures, warmup: int = 3) -> dict:
+    """Run one backend over all fixtures and collect latency/accuracy"""
+    detector = create_detector(backend)
+
+    for image, _, _ in fixtures[:warmup]:
+        detector.detect_regions(image)
+
+    latencies = []
+    face_correct = 0
+    eyes_correct = 0
+    for image, face_expected, eyes_expected in fixtures:
+        start = time.perf_counter()
+        face_detected, eyes_detected, _, _ = detector.detect_regions(image)
+        latencies.append((time.perf_counter() - start) * 1000)
+        face_correct += face_detected == face_expected
+        eyes_correct += eyes_detected == eyes_expected
+
+    latencies = np.array(latencies)
+    return {
+        "backend": backend,
+        "mean_ms": float(latencies.mean()),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "face_accuracy": face_correct / len(fixtures),
+        "eyes_accuracy": eyes_correct / len(fixtures),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face detector backends")
+    parser.add_argument("fixture_dir", help="Directory with eyes_open/, eyes_closed/ and no_face/ sub-folders")
+    parser.add_argument("--backends", nargs="+", default=list(DETECTOR_BACKENDS), choices=list(DETECTOR_BACKENDS))
+    parser.add_argument("--min-accuracy", type=float, default=0.9, help="Accuracy bar for the eyes check")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixture_dir)
+    if not fixtures:
+        print(f"No fixtures found in {args.fixture_dir}")
+        sys.exit(1)
+    print(f"Loaded {len(fixtures)} fixtures\n")
+
+    results = []
+    for backend in args.backends:
+        try:
+            results.append(benchmark(backend, fixtures))
+        except Exception as e:
+            print(f"Skipping {backend}: {e}")
+
+    print(f"{'backend':<8} {'mean ms':>9} {'p95 ms':>9} {'face acc':>9} {'eyes acc':>9}")
+    for r in sorted(results, key=lambda r: r["mean_ms"]):
+        print(
+            f"{r['backend']:<8} {r['mean_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+            f"{r['face_accuracy']:>9.1%} {r['eyes_accuracy']:>9.1%}"
+        )
+
+    eligible = [r for r in results if r["eyes_accuracy"] >= args.min_accuracy]
+    if eligible:
+        best = min(eligible, key=lambda r: r["mean_ms"])
+        print(f"\nCheapest backend meeting {args.min_accuracy:.0%} eyes accuracy: {best['backend']}")
+    else:
+        print(f"\nNo backend meets {args.min_accuracy:.0%} eyes accuracy")
+
+if __name__ == "__main__":
+    main()
@@ -2,30 +2,59 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 import os
 from app.core.config import settings
 from app.core.database import connect_to_mongo, close_mongo_connection
-from app.api import auth, users, employees, managers, admin, work_sessions, face_recognition
+from app.core.responses import MongoJSONResponse, ImmutableStaticFiles
+from app.core.profiling import ProfilerMiddleware
+from app.core.admission import AdmissionMiddleware
+from app.services.monitoring import monitoring_service
+from app.services.shift_scheduler import shift_scheduler
+from app.api import auth, users, employees, managers, admin, work_sessions
+
+# API-only workers never import the vision stack (OpenCV, detectors)
+VISION_ENABLED = settings.SERVICE_ROLE != "api"
 
 # Create necessary directories
 os.makedirs("uploads/faces", exist_ok=True)
-os.makedirs("uploads/temp", exist_ok=True)
+os.makedirs("uploads/images", exist_ok=True)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    # Monitoring state lives in vision-capable workers, so do its upkeep there
+    background_tasks = []
+    if VISION_ENABLED:
+        background_tasks.append(asyncio.create_task(monitoring_service.run_reaper()))
+        background_tasks.append(asyncio.create_task(shift_scheduler.run()))
+        from app.services.vision_pool import vision_pool
+        vision_pool.start()
+    if settings.REPORTS_ENABLED:
+        # Any role may run it: reports are claimed per team, so workers never duplicate one
+        from app.services.reports import report_service
+        background_tasks.append(asyncio.create_task(report_service.run()))
     yield
     # Shutdown
+    for task in background_tasks:
+        task.cancel()
+    if VISION_ENABLED:
+        vision_pool.stop()
     await close_mongo_connection()
 
 app = FastAPI(
     title="Work Hours Monitor API",
     description="Facial recognition-based work hours monitoring system",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=MongoJSONResponse
 )
 
+# Frame rate limits, inside CORS so browsers can read the 429
+if VISION_ENABLED and settings.FRAME_ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, in_window=monitoring_service.in_window)
+
 # CORS middleware - MUST be added before routes
 app.add_middleware(
     CORSMiddleware,
@@ -44,7 +73,11 @@ app.add_middleware(
     max_age=3600,
 )
 
-# Mount static files
+# Sampling profiler (opt-in via PROFILER_SAMPLE_RATE / PROFILER_TOKEN)
+app.add_middleware(ProfilerMiddleware)
+
+# Mount static files (content-addressed images first so they get immutable caching)
+app.mount("/uploads/images", ImmutableStaticFiles(directory="uploads/images"), name="images")
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 # Include routers
@@ -54,7 +87,9 @@ app.include_router(employees.router, prefix="/api/employees", tags=["Employees"]
 app.include_router(managers.router, prefix="/api/managers", tags=["Managers"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(work_sessions.router, prefix="/api/work-sessions", tags=["Work Sessions"])
-app.include_router(face_recognition.router, prefix="/api/face", tags=["Face Recognition"])
+if VISION_ENABLED:
+    from app.api import face_recognition
+    app.include_router(face_recognition.router, prefix="/api/face", tags=["Face Recognition"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,68 @@
+"""
+Database and upload housekeeping, safe to run against production.
+
+Tasks work in batches of MAINTENANCE_BATCH_SIZE, pause between batches
+(at least MAINTENANCE_BATCH_PAUSE_MS, and never less than the batch took)
+and checkpoint their progress in the maintenance_checkpoints collection,
+so an interrupted run picks up where it stopped. Pass --restart to start
+a task over and --dry-run to only count.
+
+    sessions      delete completed work sessions of deleted users
+    faces         delete face encodings/legacy images of deleted users
+    images        delete stored face images no user references
+    active-time   recompute total_active_time from eye detection logs
+    invalid-users delete users with an unknown role or missing fields
+    indexes       create missing indexes and report index usage
+    all           sessions, faces, images, active-time, indexes
+
+Usage:
+    python maintenance.py all --dry-run
+    python maintenance.py active-time [--restart]
+    python maintenance.py indexes [--drop work_sessions.old_index]
+"""
+import argparse
+import asyncio
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.services.maintenance import maintenance_service
+
+TASKS = {
+    "sessions": maintenance_service.purge_orphaned_sessions,
+    "faces": maintenance_service.purge_orphaned_faces,
+    "images": maintenance_service.purge_unreferenced_images,
+    "active-time": maintenance_service.recompute_active_time,
+    "invalid-users": maintenance_service.purge_invalid_users,
+}
+ALL_TASKS = ["sessions", "faces", "images", "active-time"]
+
+async def main(args):
+    if args.batch_size:
+        maintenance_service.batch_size = args.batch_size
+    if args.pause_ms is not None:
+        maintenance_service.pause_seconds = args.pause_ms / 1000
+
+    await connect_to_mongo()
+    try:
+        names = ALL_TASKS if args.task == "all" else [args.task] if args.task in TASKS else []
+        for name in names:
+            stats = await TASKS[name](dry_run=args.dry_run, restart=args.restart)
+            prefix = "[dry run] " if args.dry_run else ""
+            print(f"{prefix}{name}: " + ", ".join(f"{key} {value}" for key, value in stats.items()))
+
+        if args.task in ("indexes", "all"):
+            report = await maintenance_service.rebuild_indexes(args.drop, dry_run=args.dry_run)
+            for collection, indexes in report.items():
+                print(collection)
+                for index in indexes:
+                    print(f"  {index['name']:<40} {index['ops']:>12,} ops  {index['key']}")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("task", choices=[*TASKS, "indexes", "all"])
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    parser.add_argument("--batch-size", type=int, help="override MAINTENANCE_BATCH_SIZE")
+    parser.add_argument("--pause-ms", type=int, help="override MAINTENANCE_BATCH_PAUSE_MS")
+    parser.add_argument("--drop", action="append", metavar="COLLECTION.INDEX", help="indexes: drop an index by name")
+    asyncio.run(main(parser.parse_args()))
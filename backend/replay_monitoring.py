@@ -0,0 +1,238 @@
+"""
+Replay recorded (timestamp, user, face, eyes) detection streams through
+MonitoringService at accelerated time, to validate accounting changes and
+measure the write volume they cause. Nothing touches MongoDB: the service
+runs on a simulated clock and writes into a counting sink.
+
+Input is either a recorded stream or a synthetic day:
+
+    events.npz      arrays: timestamp (epoch s), user_id (str), eyes (bool)
+    events.csv      columns: timestamp, user_id, eyes[, face]
+    events.ndjson   one {"timestamp", "user_id", "eyes"[, "face"]} per line
+
+Usage:
+    python replay_monitoring.py --synthetic 5000
+    python replay_monitoring.py events.npz --batch-seconds 2
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+from bson import ObjectId
+from app.services.monitoring import ManualClock, MonitoringService, new_session_document
+
+class RecordingSink:
+    """Stand-in for the work_sessions collection that counts writes"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.operations = Counter()
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls["bulk_write"] += 1
+        self.operations["bulk_write"] += len(operations)
+
+    async def update_one(self, filter, update):
+        self.calls["update_one"] += 1
+        self.operations["update_one"] += 1
+
+    async def update_many(self, filter, update):
+        self.calls["update_many"] += 1
+        self.operations["update_many"] += 1
+        return SimpleNamespace(modified_count=0)
+
+    async def insert_one(self, document):
+        self.calls["insert_one"] += 1
+        self.operations["insert_one"] += 1
+
+def _parse_timestamp(value) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return (datetime.fromisoformat(value) - datetime(1970, 1, 1)).total_seconds()
+
+def _parse_bool(value) -> bool:
+    return value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes")
+
+def load_recording(path: str):
+    """Load a recorded stream as (timestamps, user indexes, eyes, user ids)"""
+    if path.endswith(".npz"):
+        data = np.load(path, allow_pickle=False)
+        timestamps, users, eyes = data["timestamp"], data["user_id"].astype(str), data["eyes"]
+    else:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".ndjson") or path.endswith(".jsonl"):
+                rows = [json.loads(line) for line in f if line.strip()]
+            else:
+                rows = list(csv.DictReader(f))
+        timestamps = np.array([_parse_timestamp(row["timestamp"]) for row in rows])
+        users = np.array([str(row["user_id"]) for row in rows])
+        eyes = np.array([_parse_bool(row["eyes"]) for row in rows])
+
+    user_ids, user_index = np.unique(users, return_inverse=True)
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order].astype(np.float64), user_index[order], eyes[order].astype(bool), list(user_ids)
+
+def recorded_batches(timestamps, user_index, eyes, batch_seconds: float):
+    """
+    Group a time-sorted stream into batches with at most one event per user,
+    keeping each user's events in order
+    """
+    if len(timestamps) == 0:
+        return
+    bounds = np.searchsorted(
+        timestamps,
+        np.arange(timestamps[0], timestamps[-1] + batch_seconds, batch_seconds),
+        side="left"
+    )
+    for start, end in zip(bounds[:-1], np.append(bounds[1:-1], len(timestamps))):
+        if start == end:
+            continue
+        users = user_index[start:end]
+        # Occurrence number of each event within its user's events in this chunk
+        order = np.argsort(users, kind="stable")
+        sorted_users = users[order]
+        first = np.searchsorted(sorted_users, sorted_users, side="left")
+        rank = np.empty(len(users), dtype=np.int64)
+        rank[order] = np.arange(len(users)) - first
+        for r in range(rank.max() + 1):
+            pick = np.nonzero(rank == r)[0] + start
+            yield timestamps[pick], user_index[pick], eyes[pick]
+
+def synthetic_batches(users: int, day_start: float, frame_interval: float, seed: int):
+    """
+    One synthetic day: each user sends a frame every frame_interval seconds
+    during an ~8.5 h shift, alternating attentive and away spells, with
+    occasional missed detections while attentive
+    """
+    rng = np.random.default_rng(seed)
+    shift_start = day_start + rng.uniform(7, 10, users) * 3600
+    shift_end = shift_start + rng.normal(8.5, 0.5, users) * 3600
+    attentive = np.ones(users, dtype=bool)
+    leave_p = frame_interval / (20 * 60)  # attentive spells average 20 minutes
+    return_p = frame_interval / (3 * 60)  # away spells average 3 minutes
+    miss_p = 0.002  # detector misses on an attentive user
+
+    everyone = np.arange(users)
+    for now in np.arange(shift_start.min(), shift_end.max(), frame_interval):
+        present = everyone[(shift_start <= now) & (now < shift_end)]
+        if len(present) == 0:
+            continue
+        flip = rng.random(len(present)) < np.where(attentive[present], leave_p, return_p)
+        attentive[present[flip]] = ~attentive[present[flip]]
+        eyes = attentive[present] & (rng.random(len(present)) >= miss_p)
+        yield np.full(len(present), now), present, eyes
+
+async def replay(batches, user_ids, clock: ManualClock, sink: RecordingSink) -> dict:
+    """Feed batches through a MonitoringService and collect accounting totals"""
+    service = MonitoringService(clock=clock, sessions_collection=sink)
+    store = service.sessions
+    index = {user_id: i for i, user_id in enumerate(user_ids)}
+    slot_of = np.full(len(user_ids), -1, dtype=np.int64)
+    accrued = np.zeros(len(user_ids), dtype=np.int64)
+    counters = Counter()
+
+    def on_stop(user_id: str):
+        i = index[user_id]
+        accrued[i] += store.active_seconds[slot_of[i]]
+        slot_of[i] = -1
+    service.stop_hooks.append(on_stop)
+
+    next_reap = None
+    first_event = last_event = None
+    for timestamps, users, eyes in batches:
+        batch_time = float(timestamps[0])
+        first_event = batch_time if first_event is None else first_event
+        last_event = float(timestamps[-1])
+        if next_reap is None:
+            next_reap = batch_time + service.reaper_interval
+
+        # Background reaper runs at its interval in simulated time
+        while next_reap <= batch_time:
+            clock.now = next_reap
+            await service.tick()
+            await service.reap_idle_sessions()
+            next_reap += service.reaper_interval
+
+        clock.now = batch_time
+        for i in users[slot_of[users] < 0]:
+            session = new_session_document({"_id": user_ids[i], "full_name": user_ids[i]}, service.owner)
+            await sink.insert_one(session)
+            await service.start_monitoring(user_ids[i], str(ObjectId()))
+            slot_of[i] = store.slot(user_ids[i])
+            counters["sessions"] += 1
+
+        await service.process_detections(slot_of[users], eyes, timestamps)
+        counters["detections"] += len(users)
+
+    # Let idle sessions be reaped, then end whatever is left
+    if last_event is not None:
+        clock.now = last_event + service.idle_timeout + service.reaper_interval
+        await service.tick()
+        await service.reap_idle_sessions()
+        await service.end_sessions([user_ids[i] for i in np.nonzero(slot_of >= 0)[0]])
+
+    return {
+        "detections": counters["detections"],
+        "sessions": counters["sessions"],
+        "span_seconds": (last_event - first_event) if first_event is not None else 0.0,
+        "accrued": accrued
+    }
+
+def print_report(result: dict, sink: RecordingSink, wall_seconds: float):
+    accrued_hours = result["accrued"] / 3600
+    detections = result["detections"]
+    users_seen = int((result["accrued"] > 0).sum())
+    print(f"Detections replayed: {detections:,} for {len(accrued_hours):,} users")
+    print(f"Simulated span:      {result['span_seconds'] / 3600:.1f} h in {wall_seconds:.2f} s "
+          f"({detections / max(wall_seconds, 1e-9):,.0f} detections/s, "
+          f"{result['span_seconds'] / max(wall_seconds, 1e-9):,.0f}x real time)")
+    print(f"Sessions started:    {result['sessions']:,}")
+    print(f"Accrued active time: {accrued_hours.sum():,.1f} h total; per user "
+          f"mean {accrued_hours.mean() if len(accrued_hours) else 0:.2f} h, "
+          f"p10/p50/p90 {np.percentile(accrued_hours, [10, 50, 90]).round(2).tolist() if len(accrued_hours) else '-'}; "
+          f"{users_seen:,} users with active time")
+    total_calls = sum(sink.calls.values())
+    total_operations = sum(sink.operations.values())
+    print(f"DB writes:           {total_operations:,} operations in {total_calls:,} calls")
+    for kind in sorted(sink.calls):
+        print(f"  {kind:<16} {sink.calls[kind]:>10,} calls {sink.operations[kind]:>12,} operations")
+
+async def main(args):
+    clock = ManualClock()
+    sink = RecordingSink()
+
+    if args.recording:
+        timestamps, user_index, eyes, user_ids = load_recording(args.recording)
+        batches = recorded_batches(timestamps, user_index, eyes, args.batch_seconds)
+    else:
+        day_start = (datetime.strptime(args.date, "%Y-%m-%d") - datetime(1970, 1, 1)).total_seconds()
+        user_ids = [f"{i:024x}" for i in range(args.synthetic)]
+        batches = synthetic_batches(args.synthetic, day_start, args.frame_interval, args.seed)
+
+    started = time.perf_counter()
+    # The service prints on every reap; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = await replay(batches, user_ids, clock, sink)
+    print_report(result, sink, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="recorded stream (.npz, .csv or .ndjson)")
+    parser.add_argument("--synthetic", type=int, default=5000, help="users in a synthetic day (no recording)")
+    parser.add_argument("--date", default=datetime.utcnow().strftime("%Y-%m-%d"), help="synthetic day, YYYY-MM-DD")
+    parser.add_argument("--frame-interval", type=float, default=2.0, help="synthetic seconds between frames")
+    parser.add_argument("--batch-seconds", type=float, default=2.0, help="recorded events grouped per batch")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.recording and not os.path.isfile(args.recording):
+        parser.error(f"{args.recording} not found")
+    asyncio.run(main(args))
@@ -0,0 +1,57 @@
+"""
+Archive and compact old work sessions, or restore them for an audit.
+
+Completed sessions older than RETENTION_COMPACT_AFTER_DAYS are written to
+RETENTION_ARCHIVE_DIR/work_sessions/YYYY-MM.ndjson.gz and reduced to
+summary documents. Run compaction from a single scheduler (e.g. a nightly
+cron job) so only one process appends to the archives.
+
+Usage:
+    python retention.py compact [--days 180] [--dry-run]
+    python retention.py list
+    python retention.py restore 2025-01 [--user-id ID] [--session-id ID ...]
+"""
+import argparse
+import asyncio
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.services.retention import retention_service
+
+async def main(args):
+    if args.command == "list":
+        for archive in retention_service.archives():
+            print(f"{archive['month']}  {archive['size'] / 1024:.0f} KB")
+        return
+
+    await connect_to_mongo()
+    try:
+        if args.command == "compact":
+            if args.days is not None:
+                retention_service.compact_after_days = args.days
+            stats = await retention_service.compact(dry_run=args.dry_run)
+            action = "Would compact" if args.dry_run else "Compacted"
+            print(
+                f"{action} {stats['sessions']} sessions ({stats['logs']} logs) "
+                f"started before {stats['cutoff']:%Y-%m-%d}; months: {', '.join(stats['months']) or '-'}"
+            )
+        elif args.command == "restore":
+            restored = await retention_service.restore(args.month, args.user_id, args.session_id)
+            print(f"Restored {restored} sessions from {args.month}")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact = commands.add_parser("compact", help="archive and compact old sessions")
+    compact.add_argument("--days", type=int, help="override RETENTION_COMPACT_AFTER_DAYS")
+    compact.add_argument("--dry-run", action="store_true", help="only report what would be compacted")
+
+    commands.add_parser("list", help="list monthly archives")
+
+    restore = commands.add_parser("restore", help="restore archived sessions")
+    restore.add_argument("month", help="archive month, YYYY-MM")
+    restore.add_argument("--user-id")
+    restore.add_argument("--session-id", action="append")
+
+    asyncio.run(main(parser.parse_args()))
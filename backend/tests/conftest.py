@@ -0,0 +1,22 @@
+import os
+import sys
+
+# Settings are required at import time; tests never reach these services
+for name, value in {
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "DB_NAME": "test",
+    "GEMINI_API_KEY": "test",
+    "MANAGER_EMAIL": "manager@example.com",
+    "GOOGLE_CALENDAR_ID": "test",
+    "SMTP_SERVER": "127.0.0.1",
+    "SMTP_PORT": "2525",
+    "SMTP_USERNAME": "",
+    "SMTP_PASSWORD": "",
+    "FROM_EMAIL": "noreply@example.com",
+    "FRONTEND_URL": "http://localhost:3000",
+    "SECRET_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+# Make `app` importable, also from spawned worker processes
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,97 @@
+import asyncio
+import socket
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+from app.core.config import settings
+from app.services.mailer import SMTPPool, build_message
+
+class Recorder(Sink):
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class Server:
+    """aiosmtpd controller that can be restarted on the same port"""
+
+    def __init__(self):
+        self.handler = Recorder()
+        self.port = free_port()
+        self.controller = None
+
+    def start(self):
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+    def restart(self):
+        # Stopping the server closes every open connection
+        self.stop()
+        self.start()
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = Server()
+    server.start()
+    monkeypatch.setattr(settings, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", server.port)
+    monkeypatch.setattr(settings, "SMTP_USERNAME", "")
+    monkeypatch.setattr(settings, "SMTP_PASSWORD", "")
+    yield server
+    server.stop()
+
+def message(n: int):
+    return build_message(["manager@example.com"], f"Report {n}", f"Body {n}")
+
+def test_messages_reuse_pool_size_connections(smtp_server):
+    handler = smtp_server.handler
+    pool = SMTPPool(size=2, idle_seconds=60)
+
+    async def scenario():
+        await asyncio.gather(*(pool.send(message(n)) for n in range(10)))
+        await pool.close()
+
+    asyncio.run(scenario())
+    assert len(handler.messages) == 10
+    assert pool.stats() == {"size": 2, "sent": 10, "connects": 2, "failed": 0}
+
+def test_reconnects_after_server_drops_connection(smtp_server):
+    handler = smtp_server.handler
+    pool = SMTPPool(size=1, idle_seconds=60)
+
+    async def scenario():
+        await pool.send(message(1))
+        await asyncio.to_thread(smtp_server.restart)
+        await asyncio.sleep(0.1)
+        await pool.send(message(2))
+        await pool.close()
+
+    asyncio.run(scenario())
+    assert len(handler.messages) == 2
+    assert pool.connects == 2
+    assert pool.failed == 0
+
+def test_close_releases_every_connection(smtp_server):
+    pool = SMTPPool(size=3, idle_seconds=60)
+
+    async def scenario():
+        await asyncio.gather(*(pool.send(message(n)) for n in range(6)))
+        clients = [client for client, _ in list(pool._idle._queue) if client is not None]
+        await pool.close()
+        return clients, list(pool._idle._queue)
+
+    clients, slots = asyncio.run(scenario())
+    assert len(clients) == 3
+    assert not any(client.is_connected for client in clients)
+    assert len(slots) == 3
+    assert all(client is None for client, _ in slots)
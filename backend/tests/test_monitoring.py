@@ -0,0 +1,41 @@
+import asyncio
+import numpy as np
+from bson import ObjectId
+from app.services.monitoring import ManualClock, MonitoringService
+
+class LogSink:
+    """Stand-in for work_sessions that keeps the eye detection log entries"""
+
+    def __init__(self):
+        self.logs = []
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.logs.append(operation._doc["$push"]["eye_detection_logs"])
+
+def replay(tick_during_gap: bool, last_frame_eyes: bool) -> list:
+    """90 s of eyes, a 30 s gap, then one more frame"""
+    async def scenario():
+        clock = ManualClock(1_000_000.0)
+        sink = LogSink()
+        service = MonitoringService(clock=clock, sessions_collection=sink)
+        await service.start_monitoring("user", str(ObjectId()))
+        slot = np.array([service.sessions.slot("user")])
+        for _ in range(91):
+            await service.process_detections(slot, np.array([True]))
+            clock.now += 1
+        clock.now += 30
+        if tick_during_gap:
+            await service.tick()
+        clock.now += 1
+        await service.process_detections(slot, np.array([last_frame_eyes]))
+        return sink.logs
+
+    return asyncio.run(scenario())
+
+def test_stale_window_logged_the_same_with_or_without_tick():
+    for last_frame_eyes in (True, False):
+        with_tick = replay(tick_during_gap=True, last_frame_eyes=last_frame_eyes)
+        without_tick = replay(tick_during_gap=False, last_frame_eyes=last_frame_eyes)
+        assert with_tick == without_tick
+        assert [(log["eyes_detected"], log["duration"]) for log in with_tick] == [(False, 90)]
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import numpy as np
+import pytest
+from app.services.vision_pool import VisionPool
+
+class StandInDetector:
+    """Reports the first pixel as the confidence; exits the process on a white frame"""
+
+    def detect_regions(self, frame):
+        if frame[0, 0, 0] == 255:
+            os._exit(3)
+        return True, True, float(frame[0, 0, 0]), []
+
+def stand_in_detector():
+    return StandInDetector()
+
+def frame(value: int) -> np.ndarray:
+    return np.full((8, 8, 3), value, dtype=np.uint8)
+
+def test_jobs_round_trip_through_worker_processes():
+    async def scenario():
+        pool = VisionPool(workers=2, slot_bytes=1024, job_timeout=30, detector_factory=stand_in_detector)
+        pool.start()
+        try:
+            results = await asyncio.gather(*(pool.detect_regions(frame(value)) for value in range(10)))
+        finally:
+            pool.stop()
+        assert [result[2] for result in results] == [float(value) for value in range(10)]
+        assert pool.stats["completed"] == 10
+        assert pool.stats["inline"] == 0
+
+    asyncio.run(scenario())
+
+def test_crashed_worker_fails_its_jobs_and_is_respawned():
+    async def scenario():
+        pool = VisionPool(workers=1, slot_bytes=1024, job_timeout=30, detector_factory=stand_in_detector)
+        pool.start()
+        try:
+            crashed = pool._processes[0]
+            with pytest.raises(RuntimeError, match="exited with code 3"):
+                await pool.detect_regions(frame(255))
+            assert pool.stats["restarts"] == 1
+            assert pool._processes[0] is not crashed
+            assert not pool._pending
+            assert pool._free_slots.qsize() == 2
+
+            # The replacement worker picks up new jobs
+            assert (await pool.detect_regions(frame(7)))[2] == 7.0
+        finally:
+            pool.stop()
+
+    asyncio.run(scenario())